@@ -0,0 +1,124 @@
+# benchmarks/cold_start.py
+"""
+Measure how long a fresh API worker takes to serve its first request.
+
+For --runs fresh processes each it times:
+  - import main: importing the app in a new interpreter (what every
+    worker pays before uvicorn can even start the lifespan)
+  - first request: from spawning `uvicorn main:app` until GET / returns
+    200, which adds interpreter and uvicorn startup and the lifespan
+
+and prints the min, median and max. With --profile it then starts one
+more worker with STARTUP_PROFILE=true and prints its report (per-module
+import times and lifespan steps).
+
+Uses DATA_BACKEND=memory by default so no database is needed; with
+--backend mongo the worker connects to MONGO_URI, as in production.
+From the backend directory:
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --profile
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_MAIN = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def worker_env(backend: str, profile: bool = False) -> dict:
+    env = dict(os.environ, DATA_BACKEND=backend, PYTHONDONTWRITEBYTECODE="1")
+    if profile:
+        env["STARTUP_PROFILE"] = "true"
+    return env
+
+
+def time_import(backend: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_MAIN],
+        env=worker_env(backend),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_first_request(backend: str, port: int, timeout: float, profile: bool = False):
+    """Seconds from spawning uvicorn to the first 200, and its output."""
+    url = f"http://127.0.0.1:{port}/"
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=worker_env(backend, profile),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        while True:
+            if worker.poll() is not None:
+                raise RuntimeError(f"worker exited:\n{worker.stdout.read()}")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"no response from {url} after {timeout}s")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started, worker
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def print_row(name: str, samples):
+    samples_ms = [sample * 1000 for sample in samples]
+    print(
+        f"{name:<16}{min(samples_ms):>10.0f}{statistics.median(samples_ms):>10.0f}"
+        f"{max(samples_ms):>10.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--profile", action="store_true", help="print one worker's STARTUP_PROFILE"
+    )
+    args = parser.parse_args()
+
+    imports = [time_import(args.backend) for _ in range(args.runs)]
+    first_requests = [
+        time_first_request(args.backend, args.port, args.timeout)[0]
+        for _ in range(args.runs)
+    ]
+    print(f"{args.runs} runs, DATA_BACKEND={args.backend}")
+    print(f"{'ms':<16}{'min':>10}{'median':>10}{'max':>10}")
+    print_row("import main", imports)
+    print_row("first request", first_requests)
+
+    if args.profile:
+        _, worker = time_first_request(
+            args.backend, args.port, args.timeout, profile=True
+        )
+        print()
+        for line in worker.stdout:
+            if line.startswith(("⏱️", " ")):
+                print(line, end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/compression.py
+"""
+Measure bytes on the wire and CPU cost of compressing API payloads.
+
+For the GET /polls/ body (100 polls) and one poll_updated broadcast it
+prints the uncompressed size, then the size, ratio and compression time
+of gzip (at GZIP_LEVEL), brotli (at BROTLI_QUALITY, when installed) and
+the zlib frames sent to /ws clients using the quickpoll.deflate
+subprotocol. The synthetic polls repeat the same texts, so real data
+compresses somewhat less.
+
+It then prices one broadcast to --sockets clients:
+  - per socket: JSON-encode and permessage-deflate the message for every
+    socket (what send_json plus the server's per-connection compression
+    did before)
+  - shared: encode and compress once, then reuse the same frame
+From the backend directory:
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --sockets 5000 --options 8
+"""
+
+import argparse
+import json
+import timeit
+import zlib
+
+from benchmarks.serialization import make_poll
+from settings import settings
+from utils.compression import brotli, compress, deflate
+from utils.serializers import dumps, poll_to_json
+
+
+def measure(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def permessage_deflate(data: bytes) -> bytes:
+    # One message on a fresh raw-deflate context, as a server compresses
+    # a frame for a connection without context takeover
+    compressor = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)[:-4]
+
+
+def payload_table(payloads: dict):
+    codecs = {
+        f"gzip -{settings.gzip_level}": lambda data: compress(data, "gzip"),
+        "ws deflate": deflate,
+    }
+    if brotli is not None:
+        codecs[f"brotli q{settings.brotli_quality}"] = lambda data: compress(data, "br")
+
+    print(f"{'payload':<24}{'codec':<14}{'bytes':>10}{'ratio':>8}{'time':>12}")
+    for name, data in payloads.items():
+        print(f"{name:<24}{'none':<14}{len(data):>10}{1:>8.2f}{'-':>12}")
+        for codec, func in codecs.items():
+            size = len(func(data))
+            seconds = measure(lambda: func(data))
+            print(
+                f"{'':<24}{codec:<14}{size:>10}{len(data) / size:>8.2f}"
+                f"{seconds * 1e6:>10.1f}us"
+            )
+    if brotli is None:
+        print("(pip install brotli to include brotli)")
+
+
+def broadcast_table(message: dict, sockets: int):
+    def per_socket():
+        for _ in range(sockets):
+            permessage_deflate(json.dumps(message).encode())
+
+    def shared():
+        deflate(dumps(message))
+
+    per_socket_seconds = measure(per_socket, repeat=3)
+    shared_seconds = measure(shared)
+    print(f"\nOne broadcast to {sockets} sockets (CPU in this process):")
+    print(f"  per socket encode + deflate  {per_socket_seconds * 1e3:10.2f} ms")
+    print(f"  shared encode + deflate      {shared_seconds * 1e3:10.3f} ms")
+    print(
+        f"  saved                        {per_socket_seconds / shared_seconds:10.0f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=100, help="polls in the list")
+    parser.add_argument("--options", type=int, default=4, help="options per poll")
+    parser.add_argument("--sockets", type=int, default=1000)
+    args = parser.parse_args()
+
+    poll_list = [poll_to_json(make_poll(args.options)) for _ in range(args.polls)]
+    message = {"type": "poll_updated", "data": poll_list[0]}
+    payload_table(
+        {
+            f"GET /polls/ ({args.polls})": dumps(poll_list),
+            "poll_updated": dumps(message),
+        }
+    )
+    broadcast_table(message, args.sockets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/fast_response.py
+"""
+Benchmark the fast poll response path against response_model re-validation.
+
+For lists of 100 and 1000 poll documents (as returned by Motor) compares:
+  - response_model: validate List[PollResponse], dump to JSON-compatible
+    data, then json.dumps (what FastAPI does for a returned dict)
+  - TypeAdapter: cached adapter, validate + dump_json in one pass
+  - fast: build JSON-safe dicts straight from BSON, encode with orjson
+and checks that all three produce the same JSON. Run from the backend
+directory:
+
+    python -m benchmarks.fast_response
+"""
+
+import argparse
+import json
+import timeit
+from typing import List
+
+from pydantic import TypeAdapter
+
+from benchmarks.serialization import make_poll
+from models.mongo_models import PollResponse
+from utils.serializers import _validated_json, dumps, poll_to_json
+
+ADAPTER = TypeAdapter(List[PollResponse])
+
+
+def response_model_path(polls):
+    validated = ADAPTER.validate_python(polls)
+    data = ADAPTER.dump_python(validated, mode="json", by_alias=True)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def type_adapter_path(polls):
+    return _validated_json(List[PollResponse], polls)
+
+
+def fast_path(polls):
+    return dumps([poll_to_json(poll) for poll in polls])
+
+
+PATHS = {
+    "response_model": response_model_path,
+    "TypeAdapter": type_adapter_path,
+    "fast": fast_path,
+}
+
+
+def measure(func, repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--options", type=int, default=4, help="options per poll")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        polls = [make_poll(args.options) for _ in range(size)]
+
+        outputs = {name: json.loads(path(polls)) for name, path in PATHS.items()}
+        assert outputs["fast"] == outputs["response_model"], "fast output differs"
+        assert outputs["TypeAdapter"] == outputs["response_model"]
+
+        timings = {
+            name: measure(lambda: path(polls), args.repeat)
+            for name, path in PATHS.items()
+        }
+        base = timings["response_model"]
+        print(f"{size} polls x {args.options} options:")
+        for name, seconds in timings.items():
+            print(f"  {name:16} {seconds * 1000:9.3f} ms   {base / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# benchmarks/loadtest.py
+"""
+Load test for the vote, like and broadcast hot paths.
+
+Registers users through /user/register, opens many /ws sockets and drives
+a weighted mix of create_poll, toggle_poll_option_vote and toggle_poll_like
+against a running API (which should point at a local mongod). Reports
+throughput, request latency per operation and vote-to-socket delivery
+latency, and saves everything as JSON so runs can be compared across
+commits. Needs the packages in benchmarks/requirements.txt.
+
+Start the API with DATA_BACKEND=memory to measure the app without any
+database latency; comparing that run with one against mongod tells a
+CPU-bound regression apart from a database-bound one. Every simulated
+user toggles far faster than a person, so also start it with
+RATE_LIMIT_ENABLED=false and MAX_IN_FLIGHT_REQUESTS=0, unless the point
+is to measure admission control itself.
+
+Run the API first, then from the backend directory:
+
+    python -m benchmarks.loadtest --users 100 --sockets 2000 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import websockets
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies_s):
+    latencies_ms = [latency * 1000 for latency in latencies_s]
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": percentile(latencies_ms, 0.50),
+        "p90_ms": percentile(latencies_ms, 0.90),
+        "p99_ms": percentile(latencies_ms, 0.99),
+        "max_ms": max(latencies_ms) if latencies_ms else None,
+    }
+
+
+def parse_mix(text):
+    """'vote=8,like=4,create=1' -> {'vote': 8, 'like': 4, 'create': 1}"""
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"vote", "like", "create"}
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.tokens = []
+        # poll_id -> list of option ids
+        self.polls = {}
+        # Per operation: latencies of successful requests, and error counts
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        # Probe sockets: poll_id -> send times of broadcasts not seen yet
+        self.probes = []
+        self.delivery = []
+        self.sockets_open = 0
+        self.sockets_failed = 0
+        self.messages_received = 0
+
+    # --- Setup ---
+    async def register(self, client, index):
+        response = await client.post(
+            "/user/register",
+            json={
+                "name": f"load {index}",
+                "email_id": f"load-{self.run_id}-{index}@example.com",
+                "password": "loadtest-password",
+            },
+        )
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    async def create_poll(self, client, token, options):
+        headers = {"Authorization": f"Bearer {token}"}
+        text = f"Load test poll {self.run_id} {uuid.uuid4().hex[:6]}"
+        response = await client.post(
+            "/polls/create",
+            json={
+                "text": text,
+                "options": [{"text": f"Option {number}"} for number in range(options)],
+            },
+            headers=headers,
+        )
+        response.raise_for_status()
+        poll = response.json()
+        self.polls[poll["_id"]] = [option["_id"] for option in poll["options"]]
+        return poll["_id"]
+
+    # --- Sockets ---
+    def expect_broadcast(self, poll_id):
+        """
+        Note the send time of a request that broadcasts poll_id. This has
+        to happen before sending: the broadcast can arrive before the
+        response does.
+        """
+        sent = time.perf_counter()
+        for pending in self.probes:
+            pending[poll_id].append(sent)
+        return sent
+
+    def cancel_broadcast(self, poll_id, sent):
+        """
+        Forget the expectation of a failed request. Left in place, it would
+        be matched with a later broadcast and inflate delivery latency.
+        """
+        for pending in self.probes:
+            try:
+                pending[poll_id].remove(sent)
+            except ValueError:
+                # The request failed after broadcasting
+                pass
+
+    async def socket(self, url, stop, probe):
+        pending = defaultdict(deque) if probe else None
+        try:
+            async with websockets.connect(url, max_queue=None) as ws:
+                self.sockets_open += 1
+                if probe:
+                    self.probes.append(pending)
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    self.messages_received += 1
+                    if not probe:
+                        continue
+                    message = json.loads(raw)
+                    if message.get("type") != "poll_updated":
+                        continue
+                    sent = pending.get(message["data"]["_id"])
+                    if sent:
+                        self.delivery.append(time.perf_counter() - sent.popleft())
+        except (OSError, websockets.WebSocketException):
+            self.sockets_failed += 1
+
+    # --- Workload ---
+    async def timed(self, operation, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors[operation] += 1
+            return None
+        self.latencies[operation].append(time.perf_counter() - started)
+        return response
+
+    async def user_loop(self, client, token, deadline):
+        headers = {"Authorization": f"Bearer {token}"}
+        operations, weights = zip(*self.args.mix.items())
+        # poll_id -> option this user currently votes for
+        my_votes = {}
+        while time.perf_counter() < deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            poll_id = self.rng.choice(list(self.polls))
+            if operation == "vote":
+                option_id = self.rng.choice(self.polls[poll_id])
+                unvote = my_votes.get(poll_id) == option_id
+                # Un-voting returns without broadcasting
+                sent = None if unvote else self.expect_broadcast(poll_id)
+                response = await self.timed(
+                    "vote",
+                    client.post(
+                        f"/polls/{poll_id}/options/{option_id}/vote", headers=headers
+                    ),
+                )
+                if response is None:
+                    if sent is not None:
+                        self.cancel_broadcast(poll_id, sent)
+                else:
+                    if unvote:
+                        my_votes.pop(poll_id, None)
+                    else:
+                        my_votes[poll_id] = option_id
+            elif operation == "like":
+                sent = self.expect_broadcast(poll_id)
+                response = await self.timed(
+                    "like", client.post(f"/polls/{poll_id}/like", headers=headers)
+                )
+                if response is None:
+                    self.cancel_broadcast(poll_id, sent)
+            else:
+                started = time.perf_counter()
+                try:
+                    await self.create_poll(client, token, self.args.options)
+                    self.latencies["create"].append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    self.errors["create"] += 1
+
+    async def run(self):
+        args = self.args
+        limits = httpx.Limits(
+            max_connections=args.users, max_keepalive_connections=args.users
+        )
+        async with httpx.AsyncClient(
+            base_url=args.base_url, limits=limits, timeout=args.timeout
+        ) as client:
+            print(f"Registering {args.users} users...")
+            self.tokens = await asyncio.gather(
+                *(self.register(client, index) for index in range(args.users))
+            )
+            print(f"Seeding {args.polls} polls...")
+            for index in range(args.polls):
+                await self.create_poll(
+                    client, self.tokens[index % len(self.tokens)], args.options
+                )
+
+            print(f"Opening {args.sockets} sockets...")
+            stop = asyncio.Event()
+            ws_url = args.base_url.replace("http", "ws", 1).rstrip("/") + "/ws"
+            socket_tasks = [
+                asyncio.create_task(
+                    self.socket(ws_url, stop, probe=index < args.probes)
+                )
+                for index in range(args.sockets)
+            ]
+            # Let the sockets connect, then drop expectations from seeding
+            await asyncio.sleep(args.connect_wait)
+            for pending in self.probes:
+                pending.clear()
+
+            print(f"Running {args.mix} for {args.duration}s...")
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(
+                *(self.user_loop(client, token, deadline) for token in self.tokens)
+            )
+            elapsed = time.perf_counter() - started
+
+            # Give the last broadcasts time to arrive
+            await asyncio.sleep(1)
+            stop.set()
+            await asyncio.gather(*socket_tasks)
+
+        completed = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "base_url": args.base_url,
+                "users": args.users,
+                "sockets": args.sockets,
+                "probes": args.probes,
+                "polls": args.polls,
+                "options_per_poll": args.options,
+                "mix": args.mix,
+                "duration_s": args.duration,
+                "seed": args.seed,
+            },
+            "throughput_rps": completed / elapsed,
+            "requests": {
+                operation: {
+                    **summarize(self.latencies[operation]),
+                    "errors": self.errors[operation],
+                }
+                for operation in args.mix
+            },
+            "delivery": summarize(self.delivery),
+            "sockets": {
+                "opened": self.sockets_open,
+                "failed": self.sockets_failed,
+                "messages_received": self.messages_received,
+            },
+        }
+
+
+def raise_file_limit(sockets):
+    """Thousands of sockets need more file descriptors than the default."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, sockets * 2 + 256))
+    if wanted > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sockets", type=int, default=1000)
+    parser.add_argument(
+        "--probes",
+        type=int,
+        default=20,
+        help="sockets that measure delivery latency",
+    )
+    parser.add_argument("--polls", type=int, default=20, help="polls seeded up front")
+    parser.add_argument("--options", type=int, default=4, help="options per poll")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=parse_mix("vote=8,like=4,create=1")
+    )
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--connect-wait", type=float, default=3)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="where to save the JSON results (default: benchmarks/results/)",
+    )
+    args = parser.parse_args()
+    if args.mix.get("vote") and args.options < 1:
+        parser.error("--options must be at least 1 when the mix includes votes")
+
+    raise_file_limit(args.sockets)
+    results = asyncio.run(LoadTest(args).run())
+
+    output = args.output or Path("benchmarks/results") / (
+        f"loadtest-{results['meta']['commit'] or 'nogit'}-"
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/metrics_overhead.py
+"""
+Benchmark the overhead of the /metrics instrumentation.
+
+Drives a FastAPI app directly over ASGI (no network, no database) with
+and without MetricsMiddleware, so the difference is the instrumentation
+alone. Against real requests that wait on MongoDB the relative overhead
+is far smaller. Run from the backend directory:
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import FastAPI
+
+from middleware.metrics import MetricsMiddleware
+from models.mongo_models import PollResponse
+from utils.metrics import Histogram
+
+POLL = {
+    "_id": ObjectId(),
+    "text": "Which benchmark is the fastest?",
+    "likes": 3,
+    "creator_id": str(ObjectId()),
+    "created_at": datetime.utcnow(),
+    "options": [],
+}
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/polls/{poll_id}", response_model=PollResponse)
+    async def get_poll(poll_id: str):
+        return POLL
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/polls/abc",
+        "raw_path": b"/polls/abc",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+async def run(requests: int, rounds: int):
+    plain = make_app(instrumented=False)
+    instrumented = make_app(instrumented=True)
+    # Warm up both apps (builds the middleware stack)
+    await drive(plain, 100)
+    await drive(instrumented, 100)
+
+    plain_times, instrumented_times = [], []
+    for _ in range(rounds):
+        plain_times.append(await drive(plain, requests))
+        instrumented_times.append(await drive(instrumented, requests))
+    best_plain = min(plain_times) / requests * 1e6
+    best_instrumented = min(instrumented_times) / requests * 1e6
+
+    histogram = Histogram("bench", "bench", labels=("command",))
+    started = time.perf_counter()
+    for i in range(requests):
+        histogram.observe(i / requests, "find")
+    observe_cost = (time.perf_counter() - started) / requests * 1e6
+
+    overhead = best_instrumented - best_plain
+    print(f"requests per round:     {requests} x {rounds} rounds")
+    print(f"plain request:          {best_plain:.1f} us")
+    print(f"instrumented request:   {best_instrumented:.1f} us")
+    print(f"overhead per request:   {overhead:.1f} us ({overhead / best_plain:.1%})")
+    print(f"histogram observe():    {observe_cost:.2f} us (per Mongo command)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/poll_results.py
+"""
+Compare the two ways a dashboard can refresh the tallies of many polls.
+
+Seeds --polls open polls with --options options each in the in-memory
+backend, then, through the app in process (no network), times:
+  - per poll: GET /polls/{poll_id} for every poll, sent concurrently
+  - results: one POST /polls/results with every poll id
+and prints the time and response bytes of each. The payload of the
+results call only grows with the number of counts; the per-poll bodies
+also carry every poll and option text and timestamp. From the backend
+directory:
+
+    python -m benchmarks.poll_results
+    python -m benchmarks.poll_results --polls 500 --options 8
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from settings import settings
+
+# Must be set before the app is imported: dbconn checks it on import
+settings.data_backend = "memory"
+
+from benchmarks.serialization import make_poll  # noqa: E402
+from main import app  # noqa: E402
+from utils.database import get_repository  # noqa: E402
+
+
+async def seed(polls: int, options: int) -> list:
+    repository = get_repository()
+    poll_ids = []
+    for _ in range(polls):
+        poll = make_poll(options)
+        poll_options = poll.pop("options")
+        await repository.create_poll(poll)
+        await repository.create_poll_options(str(poll["_id"]), poll_options)
+        poll_ids.append(str(poll["_id"]))
+    return poll_ids
+
+
+async def per_poll(client: httpx.AsyncClient, poll_ids: list) -> int:
+    responses = await asyncio.gather(
+        *(client.get(f"/polls/{poll_id}") for poll_id in poll_ids)
+    )
+    return sum(len(response.content) for response in responses)
+
+
+async def results(client: httpx.AsyncClient, poll_ids: list) -> int:
+    response = await client.post("/polls/results", json={"poll_ids": poll_ids})
+    response.raise_for_status()
+    return len(response.content)
+
+
+async def measure(func, client, poll_ids, runs: int):
+    """Best time of runs calls, and the bytes returned by one."""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        size = await func(client, poll_ids)
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    poll_ids = await seed(args.polls, args.options)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        rows = [
+            (
+                f"per poll (x{args.polls})",
+                *await measure(per_poll, client, poll_ids, args.runs),
+            ),
+            ("results (x1)", *await measure(results, client, poll_ids, args.runs)),
+        ]
+    print(f"{args.polls} polls, {args.options} options each, best of {args.runs}")
+    print(f"{'':<20}{'ms':>10}{'bytes':>12}")
+    for name, seconds, size in rows:
+        print(f"{name:<20}{seconds * 1000:>10.1f}{size:>12,}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
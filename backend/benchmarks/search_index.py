@@ -0,0 +1,88 @@
+# benchmarks/search_index.py
+"""
+Benchmark the in-memory poll search index.
+
+Builds the index over synthetic poll texts and reports build time, memory
+footprint and query latency. Run from the backend directory:
+
+    python -m benchmarks.search_index --polls 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from itertools import accumulate
+
+from bson import ObjectId
+
+from utils.search import PollSearchIndex
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_polls(count: int, vocabulary, rng: random.Random):
+    # Zipf-like word frequencies, like real text
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for _ in range(count):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(4, 14))
+        yield {"_id": ObjectId(), "text": " ".join(words).capitalize() + "?"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    polls = list(make_polls(args.polls, vocabulary, rng))
+
+    index = PollSearchIndex()
+    started = time.perf_counter()
+    index.build_from(polls)
+    build_seconds = time.perf_counter() - started
+
+    # Build a second copy under tracemalloc, which slows the build down
+    tracemalloc.start()
+    measured = PollSearchIndex()
+    measured.build_from(polls)
+    memory_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Mix of one-word prefix queries and multi-word queries
+    queries = []
+    for _ in range(args.queries):
+        text = rng.choice(polls)["text"].rstrip("?").split()
+        words = rng.sample(text, k=min(len(text), rng.randint(1, 3)))
+        words[-1] = words[-1][: rng.randint(1, len(words[-1]))]
+        queries.append(" ".join(words))
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    print(f"polls:         {len(index)}")
+    print(f"vocabulary:    {len(index.vocabulary)}")
+    print(f"build time:    {build_seconds:.2f} s")
+    print(f"index memory:  {memory_bytes / 2**20:.1f} MiB")
+    print(f"query p50:     {statistics.median(latencies):.3f} ms")
+    print(f"query p99:     {latencies[int(len(latencies) * 0.99) - 1]:.3f} ms")
+    print(f"query max:     {latencies[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
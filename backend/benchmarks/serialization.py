@@ -0,0 +1,209 @@
+# benchmarks/serialization.py
+"""
+Microbenchmarks for model validation and serialization hot spots.
+
+Covers PyObjectId validation, PollOptionResponse / PollResponse
+construction, the model_dump(mode="json", by_alias=True) done for every
+broadcast, and List[PollResponse] validation + serialization (what
+FastAPI's response_model does) for 100 and 1000 polls.
+
+Each case runs a fixed number of calls per timing run, and the cases
+take turns run by run, so a noisy moment on the machine is spread over
+all of them rather than landing on one. A case's time is the median
+over --repeat runs. A case slower than baseline * (1 + threshold) is
+measured again the same way, and only counts as a regression if that
+rerun is slow too. The script then exits with status 1, so CI can run it
+as a gate. A missing baseline file, or a case missing from it, also
+fails the gate rather than passing unchecked. Baselines are machine
+specific: record one on the CI runner from the target branch, then
+compare the change against it (see the README):
+
+    python -m benchmarks.serialization --save-baseline   # on main
+    python -m benchmarks.serialization                   # on the branch
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from models.mongo_models import PollOptionResponse, PollResponse, PyObjectId
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "serialization.json"
+
+
+def make_option(poll_id: str, number: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "poll_id": poll_id,
+        "text": f"Option number {number}",
+        "votes": number * 7,
+        "created_at": datetime(2025, 1, 1, 12, 0, number),
+    }
+
+
+def make_poll(options: int = 4) -> dict:
+    poll_id = ObjectId()
+    return {
+        "_id": poll_id,
+        "text": "Which of these options should win the benchmark?",
+        "likes": 42,
+        "creator_id": str(ObjectId()),
+        "created_at": datetime(2025, 1, 1, 12, 0, 0),
+        "options": [make_option(str(poll_id), n) for n in range(options)],
+    }
+
+
+def build_cases():
+    """
+    name -> (zero-argument callable doing one unit of work, calls per
+    timing run). The counts keep each run around 10 ms on a laptop, long
+    enough that timer resolution and single interruptions wash out.
+    """
+    object_id = ObjectId()
+    object_id_str = str(object_id)
+    object_id_adapter = TypeAdapter(PyObjectId)
+    option = make_option(str(object_id), 1)
+    poll = make_poll()
+    poll_model = PollResponse(**poll)
+    list_adapter = TypeAdapter(List[PollResponse])
+    polls_100 = [make_poll() for _ in range(100)]
+    polls_1000 = [make_poll() for _ in range(1000)]
+
+    def list_response(polls):
+        # FastAPI validates the returned value against response_model,
+        # then serializes it to JSON-compatible data by alias
+        validated = list_adapter.validate_python(polls)
+        return list_adapter.dump_python(validated, mode="json", by_alias=True)
+
+    return {
+        "PyObjectId.validate(str)": (
+            lambda: PyObjectId.validate(object_id_str),
+            5000,
+        ),
+        "PyObjectId schema (str)": (
+            lambda: object_id_adapter.validate_python(object_id_str),
+            5000,
+        ),
+        "PyObjectId schema (ObjectId)": (
+            lambda: object_id_adapter.validate_python(object_id),
+            20000,
+        ),
+        "PollOptionResponse(**doc)": (lambda: PollOptionResponse(**option), 5000),
+        "PollResponse(**doc), 4 options": (lambda: PollResponse(**poll), 1000),
+        "PollResponse.model_dump(json)": (
+            lambda: poll_model.model_dump(mode="json", by_alias=True),
+            500,
+        ),
+        "broadcast: validate + dump": (
+            lambda: PollResponse(**poll).model_dump(mode="json", by_alias=True),
+            500,
+        ),
+        "List[PollResponse] x100": (lambda: list_response(polls_100), 5),
+        "List[PollResponse] x1000": (lambda: list_response(polls_1000), 1),
+    }
+
+
+def measure(cases: dict, repeat: int) -> dict:
+    """
+    Median seconds per call of each case over `repeat` timing runs,
+    taking turns between the cases run by run.
+    """
+    timers = {
+        name: (timeit.Timer(func), number) for name, (func, number) in cases.items()
+    }
+    # Warm up: first calls fill pydantic's and the allocator's caches
+    for timer, number in timers.values():
+        timer.timeit(number)
+    runs = {name: [] for name in timers}
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            runs[name].append(timer.timeit(number) / number)
+    return {name: statistics.median(times) for name, times in runs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="record the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.50,
+        help="allowed slowdown before failing (0.50 = 50%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=21)
+    args = parser.parse_args()
+
+    if not args.save_baseline and not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 1
+
+    cases = build_cases()
+    results = measure(cases, args.repeat)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2))
+        for name, seconds in results.items():
+            print(f"{name:34} {seconds * 1e6:12.2f} us")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+
+    def slow(name: str, seconds: float) -> bool:
+        return seconds / baseline[name] - 1 > args.threshold
+
+    # Confirm slow cases on a second pass before calling them regressions
+    suspects = {
+        name: cases[name]
+        for name, seconds in results.items()
+        if name in baseline and slow(name, seconds)
+    }
+    rerun = measure(suspects, args.repeat) if suspects else {}
+
+    regressions = []
+    unchecked = []
+    for name, seconds in results.items():
+        line = f"{name:34} {seconds * 1e6:12.2f} us"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"   {change:+7.1%} vs baseline"
+            if name in rerun:
+                rerun_change = rerun[name] / baseline[name] - 1
+                line += f" ({rerun_change:+.1%} on rerun)"
+                if slow(name, rerun[name]):
+                    line += "   REGRESSION"
+                    regressions.append(name)
+        else:
+            line += "   NO BASELINE"
+            unchecked.append(name)
+        print(line)
+
+    if regressions:
+        print(
+            f"{len(regressions)} case(s) regressed more than {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+    if unchecked:
+        print(
+            f"{len(unchecked)} case(s) missing from {args.baseline}; "
+            "run with --save-baseline to record them: " + ", ".join(unchecked)
+        )
+    return 1 if regressions or unchecked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/shard_writes.py
+"""
+Measure vote/like write throughput as polls are spread over more shards.
+
+Start N local mongod instances (one per port), then from the backend
+directory:
+
+    python -m benchmarks.shard_writes --shard-uris \\
+        mongodb://localhost:27017/quickpoll_bench \\
+        mongodb://localhost:27018/quickpoll_bench \\
+        mongodb://localhost:27019/quickpoll_bench
+
+For 1..N shards it seeds polls, then runs concurrent workers doing the
+writes of the vote and like toggles (insert the action, $inc the counter)
+through utils/database.py for a fixed time, and prints writes/s and the
+scaling efficiency against one shard. Every database must be named
+quickpoll_bench*, because they are dropped before each run.
+
+Give each mongod its own disk/cores, or the instances compete with each
+other. If efficiency drops while the mongods are not busy, this
+process is the bottleneck: raise --workers or run one copy per shard.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import dbconn
+from settings import settings
+from utils.database import (
+    create_poll_in_db,
+    create_poll_option_in_db,
+    create_like_action_in_db,
+    create_vote_action_in_db,
+    ensure_indexes,
+    update_poll_likes_in_db,
+    update_poll_option_votes_in_db,
+)
+
+
+async def seed(polls: int, options: int):
+    """Create polls with options. Returns [(poll ObjectId, [option ids])]."""
+    seeded = []
+    for number in range(polls):
+        result = await create_poll_in_db(
+            {
+                "text": f"Benchmark poll {number}",
+                "creator_id": "bench",
+                "likes": 0,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        poll_id = result.inserted_id
+        option_ids = []
+        for option in range(options):
+            result = await create_poll_option_in_db(
+                {
+                    "poll_id": str(poll_id),
+                    "text": f"Option {option}",
+                    "votes": 0,
+                    "created_at": datetime.utcnow(),
+                }
+            )
+            option_ids.append(result.inserted_id)
+        seeded.append((poll_id, option_ids))
+    return seeded
+
+
+async def worker(polls, deadline: float, rng: random.Random, user: str) -> int:
+    """Vote and like until the deadline. Returns the number of writes."""
+    writes = 0
+    while time.perf_counter() < deadline:
+        poll_id, option_ids = rng.choice(polls)
+        if rng.random() < 0.7:
+            option_id = rng.choice(option_ids)
+            await create_vote_action_in_db(
+                {
+                    "poll_id": str(poll_id),
+                    "poll_option_id": str(option_id),
+                    "user_id": user,
+                    "created_at": datetime.utcnow(),
+                }
+            )
+            await update_poll_option_votes_in_db(str(poll_id), option_id, 1)
+        else:
+            await create_like_action_in_db(
+                {
+                    "poll_id": str(poll_id),
+                    "user_id": user,
+                    "created_at": datetime.utcnow(),
+                }
+            )
+            await update_poll_likes_in_db(poll_id, 1)
+        writes += 2
+    return writes
+
+
+async def run(shard_uris, args) -> float:
+    settings.mongo_uri = shard_uris[0]
+    settings.db_name = "quickpoll_bench"
+    settings.mongo_shard_uris = shard_uris
+    await dbconn.startup_client()
+    try:
+        for db in dbconn.get_shard_databases():
+            await db.client.drop_database(db.name)
+        await ensure_indexes()
+        polls = await seed(args.polls, args.options)
+
+        rng = random.Random(args.seed)
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        writes = await asyncio.gather(
+            *(
+                worker(polls, deadline, random.Random(rng.random()), f"user-{n}")
+                for n in range(args.workers)
+            )
+        )
+        return sum(writes) / (time.perf_counter() - started)
+    finally:
+        dbconn.close_client()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shard-uris", nargs="+", required=True)
+    parser.add_argument("--workers", type=int, default=64, help="concurrent writers")
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for uri in args.shard_uris:
+        database = uri.rsplit("/", 1)[-1].split("?")[0]
+        if not database.startswith("quickpoll_bench"):
+            parser.error(f"{uri}: database name must start with quickpoll_bench")
+
+    baseline = None
+    for count in range(1, len(args.shard_uris) + 1):
+        rate = await run(args.shard_uris[:count], args)
+        baseline = baseline or rate
+        print(
+            f"{count} shard(s): {rate:10.0f} writes/s   "
+            f"{rate / baseline:5.2f}x   efficiency {rate / (baseline * count):5.0%}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,38 +1,88 @@
 # dbconn.py
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
-import os
-from typing import Optional
+import asyncio
 
-# Load env variables
-load_dotenv()
+from settings import settings
 
-# --- Configuration ---
-# For a local MongoDB, this might be: "mongodb://localhost:27017/"
-ATLAS_URI: Optional[str] = os.environ.get("MONGO_URI")
-DB_NAME: Optional[str] = os.environ.get("DB_NAME")
-
-if not ATLAS_URI:
+if settings.data_backend == "mongo" and not settings.mongo_uri:
     raise RuntimeError("MONGO_URI environment variable is not set")
 
 
 # Shared MongoClient instance for the app (Initialized to None)
 client = None
 db = None
+# Poll shards: one database per MONGO_SHARD_URIS entry (or just db), plus
+# handles for the reads that may be served by a secondary
+shard_clients: dict = {}
+shard_dbs: list = []
+shard_read_dbs: list = []
+
+
+def _new_client(uri: str):
+    # Imported here: Motor and pymongo take a noticeable share of startup,
+    # and the in-memory backend never needs them
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from utils.mongo_metrics import MongoCommandMetrics, MongoPoolMetrics
+
+    return AsyncIOMotorClient(
+        uri,
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        timeoutMS=settings.mongo_timeout_ms or None,
+        # Record per-command durations and pool waits for /metrics
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()],
+    )
+
+
+def _read_handle(database):
+    """The database itself, or a secondary-preferred copy of it."""
+    if not settings.mongo_secondary_reads:
+        return database
+    from pymongo.read_preferences import SecondaryPreferred
+
+    return database.with_options(
+        read_preference=SecondaryPreferred(
+            max_staleness=settings.mongo_max_staleness_seconds
+        )
+    )
 
 
 # Function to initialize and test the MongoDB connection
 async def startup_client():
     """Initializes and tests the MongoDB connection."""
-    global client, db
+    global client, db, shard_clients, shard_dbs, shard_read_dbs
+    if settings.data_backend == "memory":
+        print("🧠 Using the in-memory data backend; nothing is persisted.")
+        return
     try:
         # Create a AsyncIOMotorClient instance (async version)
-        client = AsyncIOMotorClient(ATLAS_URI, serverSelectionTimeoutMS=5000)
-        db = client[DB_NAME]
+        client = _new_client(settings.mongo_uri)
+        db = client[settings.db_name]
+
+        # One client per distinct shard URI (the main one is reused)
+        shard_clients = {settings.mongo_uri: client}
+        shard_dbs = []
+        for uri in settings.mongo_shard_uris:
+            if uri not in shard_clients:
+                shard_clients[uri] = _new_client(uri)
+            shard_dbs.append(shard_clients[uri].get_default_database(settings.db_name))
+        if not shard_dbs:
+            shard_dbs = [db]
+        shard_read_dbs = [_read_handle(shard_db) for shard_db in shard_dbs]
 
         # The 'ping' command tests the connection
-        await client.admin.command("ping")
-        print("✅ Successfully connected to MongoDB.")
+        if settings.mongo_startup_ping:
+            await asyncio.gather(
+                *(
+                    shard_client.admin.command("ping")
+                    for shard_client in shard_clients.values()
+                )
+            )
+            print("✅ Successfully connected to MongoDB.")
+        if settings.mongo_shard_uris:
+            print(f"🧩 Polls are spread over {len(shard_dbs)} shard databases.")
+        await warm_up_pool()
 
     # Catch any other unexpected error
     except Exception as e:
@@ -42,6 +92,25 @@ async def startup_client():
         ) from e
 
 
+async def warm_up_pool():
+    """
+    Open MONGO_MIN_POOL_SIZE connections now, so the first requests do
+    not pay for TCP/TLS handshakes and authentication.
+    """
+    if settings.mongo_min_pool_size <= 0:
+        return
+    # Concurrent pings each need their own connection
+    pings = []
+    handles = [db, *shard_dbs, *shard_read_dbs]
+    for database in {id(handle): handle for handle in handles}.values():
+        pings += [
+            database.command("ping", read_preference=database.read_preference)
+            for _ in range(settings.mongo_min_pool_size)
+        ]
+    await asyncio.gather(*pings)
+    print(f"🔥 Warmed up {settings.mongo_min_pool_size} connections per MongoDB pool.")
+
+
 def get_database():
     """Return the database instance."""
     if db is None:
@@ -49,6 +118,13 @@ def get_database():
     return db
 
 
+def get_shard_databases(secondary_ok: bool = False) -> list:
+    """Return the poll shard databases, in MONGO_SHARD_URIS order."""
+    if not shard_dbs:
+        raise RuntimeError("Database not initialized. Call startup_client() first.")
+    return shard_read_dbs if secondary_ok else shard_dbs
+
+
 # Function to get the MongoDB client instance
 def get_client():
     """Returns the globally available MongoClient instance."""
@@ -62,5 +138,8 @@ def get_client():
 def close_client():
     """Closes the globally available MongoClient connection."""
     if client:
+        for shard_client in shard_clients.values():
+            if shard_client is not client:
+                shard_client.close()
         client.close()
         print("🔌 MongoDB connection closed.")
@@ -1,16 +1,41 @@
 # main.py
-from fastapi import FastAPI
+# Settings load the env variables, once for every module
+from settings import settings
+from utils.startup import startup_profile
+
+# With STARTUP_PROFILE on, time every import below
+startup_profile.start_import_timer()
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-import os
+import asyncio
 from contextlib import asynccontextmanager
 
 # Internal imports
 from dbconn import startup_client, close_client
 from routers import users, polls, websocket
+from routers.websocket import manager
+from middleware.admission import AdmissionMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.idempotency import IdempotencyMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.tracing import TracingMiddleware
+from utils.metrics import registry
+from utils.database import (
+    ensure_indexes,
+    iter_poll_texts_from_db,
+    iter_poll_ids_from_db,
+    iter_like_actions_from_db,
+    iter_vote_actions_from_db,
+)
+from utils.trending import trending, run_trending_checkpoints
+from utils.search import search_index
+from utils.bloom import like_filter, vote_filter
+from utils.reconcile import run_counter_reconciler
+from utils.archive import run_action_archiver
+from utils.shutdown import shutdown_drain
 
-# Load env variables
-load_dotenv()
+startup_profile.stop_import_timer()
 
 
 # Define the Lifespan Manager
@@ -21,12 +46,50 @@ async def lifespan(app: FastAPI):
     """
     print("Application startup...")
     # Initialize and test the MongoDB connection
-    await startup_client()
+    await startup_profile.timed("startup_client", startup_client())
+    # Create the indexes and restore the trending ranking side by side:
+    # neither needs the other, and both wait on MongoDB round trips
+    await asyncio.gather(
+        startup_profile.timed("ensure_indexes", ensure_indexes()),
+        startup_profile.timed("trending.load", trending.load()),
+    )
+    # Keep checkpointing the trending ranking
+    background_tasks = [
+        asyncio.create_task(run_trending_checkpoints()),
+        # Build the search index in the background so startup is not blocked
+        asyncio.create_task(search_index.build(iter_poll_texts_from_db())),
+        asyncio.create_task(
+            like_filter.build(iter_poll_ids_from_db(), iter_like_actions_from_db())
+        ),
+        asyncio.create_task(
+            vote_filter.build(iter_poll_ids_from_db(), iter_vote_actions_from_db())
+        ),
+    ]
+    if settings.reconcile_enabled:
+        background_tasks.append(asyncio.create_task(run_counter_reconciler()))
+    if settings.archive_enabled:
+        background_tasks.append(asyncio.create_task(run_action_archiver()))
+    startup_profile.report()
+    # On SIGTERM, drain requests and sockets before the server shuts down
+    shutdown_drain.install(manager)
     try:
         yield
     finally:
         # Close the MongoDB connection
         print("Application shutdown...")
+        for task in background_tasks:
+            task.cancel()
+        # Flush (the trending checkpoint) within what is left of the deadline
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*background_tasks, return_exceptions=True),
+                timeout=shutdown_drain.remaining(),
+            )
+        except asyncio.TimeoutError:
+            print("⚠️ Background tasks did not stop before the drain deadline.")
+        for action_filter in (like_filter, vote_filter):
+            if action_filter.enabled:
+                print(f"🌸 {action_filter.name} filter: {action_filter.stats()}")
         close_client()
 
 
@@ -34,24 +97,46 @@ async def lifespan(app: FastAPI):
 app = FastAPI(title="QuickPoll API", lifespan=lifespan)
 
 # Include routers
-app.include_router(users.router)
-app.include_router(polls.router)
-app.include_router(websocket.router)
+with startup_profile.step("include routers"):
+    app.include_router(users.router)
+    app.include_router(polls.router)
+    app.include_router(websocket.router)
 
-# Get frontend url from env
-FRONTEND_URL = os.environ.get("FRONTEND_URL")
+# Replay responses of POSTs retried with the same Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+# Shed load with 503 once too many requests are in flight (added before
+# CORS so those responses still carry the CORS headers)
+app.add_middleware(AdmissionMiddleware)
 
 # Configure CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[FRONTEND_URL],
+    allow_origins=[settings.frontend_url],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (gzip, or brotli when installed)
+app.add_middleware(CompressionMiddleware)
+
+# Trace a sample of requests for the slow log
+app.add_middleware(TracingMiddleware)
+
+# Record route latencies (added last so it wraps everything else)
+app.add_middleware(MetricsMiddleware)
+
 
 # Example Route
 @app.get("/")
 async def root():
     return {"message": "Hello from quick poll-inator"}
+
+
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,53 @@
+# middleware/admission.py
+import json
+
+from settings import settings
+from utils.metrics import http_requests_in_flight, requests_rejected_total
+from utils.shutdown import shutdown_drain
+
+# Always served, so the worker can still be observed while it sheds load
+EXEMPT_PATHS = {"/metrics"}
+
+_BUSY_BODY = json.dumps({"detail": "Server busy, try again shortly"}).encode()
+_BUSY_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(_BUSY_BODY)).encode()),
+    (b"retry-after", b"1"),
+]
+
+
+class AdmissionMiddleware:
+    """
+    Global concurrency limit: once MAX_IN_FLIGHT_REQUESTS HTTP requests are
+    being handled, new ones get an immediate 503 instead of queueing
+    behind the event loop and the MongoDB pool, where they would time out
+    anyway after holding resources.
+
+    The count is kept on shutdown_drain, which waits for it to reach 0
+    before a worker shuts down.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = settings.max_in_flight_requests
+        if 0 < limit <= shutdown_drain.in_flight:
+            requests_rejected_total.inc("global", "overload")
+            await send(
+                {"type": "http.response.start", "status": 503, "headers": _BUSY_HEADERS}
+            )
+            await send({"type": "http.response.body", "body": _BUSY_BODY})
+            return
+
+        shutdown_drain.in_flight += 1
+        http_requests_in_flight.set(shutdown_drain.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shutdown_drain.in_flight -= 1
+            http_requests_in_flight.set(shutdown_drain.in_flight)
@@ -0,0 +1,85 @@
+# middleware/compression.py
+from starlette.datastructures import Headers, MutableHeaders
+
+from settings import settings
+from utils.compression import (
+    COMPRESSIBLE_TYPES,
+    StreamCompressor,
+    choose_encoding,
+    compress,
+)
+
+
+class CompressionMiddleware:
+    """
+    Compresses HTTP responses with brotli or gzip, as negotiated through
+    Accept-Encoding, when they are JSON/text and at least
+    COMPRESSION_MIN_BYTES long. Single-message bodies (every JSON
+    response of this API) are compressed in one go; streamed bodies are
+    compressed chunk by chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        # None until the first body message decides; then False or a compressor
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                start_message = message
+                return
+            if message_type != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < settings.compression_min_bytes)
+                ):
+                    stream = False
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    stream = False
+                    body = compress(body, encoding)
+                    headers["content-length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["content-length"]
+                stream = StreamCompressor(encoding)
+                await send(start_message)
+
+            if stream:
+                body = stream.compress(body, last=not more_body)
+                message = {
+                    "type": "http.response.body",
+                    "body": body,
+                    "more_body": more_body,
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,108 @@
+# middleware/idempotency.py
+import json
+
+from utils.idempotency import IdempotencyConflict, begin, finish, scoped_key
+
+# Longest Idempotency-Key accepted (a UUID is 36 characters)
+MAX_KEY_LENGTH = 255
+
+# Only the poll write routes (create, vote, like, close) take a key. The
+# /user routes hand out access tokens, which must never be stored or replayed.
+IDEMPOTENT_PATH_PREFIX = "/polls/"
+
+_CONFLICT_BODY = json.dumps(
+    {"detail": "A request with this Idempotency-Key is still in progress"}
+).encode()
+_INVALID_BODY = json.dumps({"detail": "Invalid Idempotency-Key"}).encode()
+
+
+async def _send_response(send, status: int, headers: list, body: bytes):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _json_headers(body: bytes) -> list:
+    return [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response of a POST retried with the same
+    Idempotency-Key header, from the same caller to the same route,
+    without running it again: a retried like/vote toggle does not flip
+    the state back, write to MongoDB or broadcast a second time.
+
+    Responses are kept for IDEMPOTENCY_TTL_SECONDS. 5xx and 429 responses
+    are not kept, so retrying those runs the request again. Requests
+    without an Authorization header, or outside /polls/, ignore the key:
+    keys are scoped by token, so anonymous callers would share them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(IDEMPOTENT_PATH_PREFIX)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        raw_key = headers.get(b"idempotency-key")
+        authorization = headers.get(b"authorization")
+        if raw_key is None or not authorization:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await _send_response(send, 400, _json_headers(_INVALID_BODY), _INVALID_BODY)
+            return
+
+        key = scoped_key(authorization, scope["path"], raw_key.decode("latin-1"))
+        try:
+            stored = await begin(key)
+        except IdempotencyConflict:
+            await _send_response(
+                send, 409, _json_headers(_CONFLICT_BODY), _CONFLICT_BODY
+            )
+            return
+        if stored is not None:
+            replay_headers = [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in stored["headers"]
+            ]
+            replay_headers.append((b"idempotent-replayed", b"true"))
+            await _send_response(send, stored["status"], replay_headers, stored["body"])
+            return
+
+        # Run the request, keeping a copy of its (small, JSON) response
+        response = {"status": 500, "headers": [], "body": b""}
+        body_parts = []
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+            await send(message)
+
+        keep = False
+        try:
+            await self.app(scope, receive, send_and_record)
+            status = response["status"]
+            keep = status < 500 and status != 429
+        finally:
+            if keep:
+                response["body"] = b"".join(body_parts)
+                await finish(key, response)
+            else:
+                await finish(key, None)
@@ -0,0 +1,40 @@
+# middleware/metrics.py
+from time import perf_counter
+
+from utils.metrics import http_request_duration, http_requests_total
+
+
+class MetricsMiddleware:
+    """
+    Records latency and status of every HTTP request, labelled with the
+    route template (e.g. /polls/{poll_id}) so ids don't explode the labels.
+
+    Plain ASGI rather than BaseHTTPMiddleware, to keep per-request overhead
+    to a couple of timer reads and dict updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_request_duration.observe(perf_counter() - started, method, route)
+            http_requests_total.inc(method, route, str(status_code))
@@ -0,0 +1,43 @@
+# middleware/tracing.py
+from settings import settings
+from utils.tracing import (
+    should_sample,
+    start_trace,
+    end_trace,
+    log_slow_request,
+)
+
+
+class TracingMiddleware:
+    """
+    Traces a sample of HTTP requests and writes the span tree of those
+    slower than SLOW_REQUEST_MS to the slow log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_sample():
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        root, token = start_trace(scope["method"])
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            end_trace(root, token)
+            if root.duration_ms >= settings.slow_request_ms:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                root.name = f"{scope['method']} {route}"
+                log_slow_request(
+                    root, scope["method"], route, scope["path"], status_code
+                )
@@ -1,9 +1,9 @@
 # models/mongo_models.py
-from pydantic import BaseModel, Field, EmailStr, GetJsonSchemaHandler
+from pydantic import BaseModel, Field, EmailStr, GetJsonSchemaHandler, field_validator
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
-from typing import Optional, Any, List
-from datetime import datetime
+from typing import Optional, Any, List, Dict
+from datetime import datetime, timezone
 from bson import ObjectId
 
 
@@ -125,6 +125,17 @@ class PollCreate(BaseModel):
     """Data model for creating a new Poll."""
 
     text: str = Field(..., min_length=3, max_length=300)
+    closes_at: Optional[datetime] = None  # Voting deadline, if any
+    # Options created together with the poll
+    options: List[PollOptionCreate] = Field(default_factory=list, max_length=50)
+
+    @field_validator("closes_at")
+    @classmethod
+    def to_naive_utc(cls, v):
+        # Stored like every other timestamp: naive UTC
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
 
 
 class PollInDB(MongoBaseModel):
@@ -134,6 +145,8 @@ class PollInDB(MongoBaseModel):
     likes: int = Field(default=0, ge=0)
     creator_id: str  # ID of the User who created the poll
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    closes_at: Optional[datetime] = None  # Deadline set at creation
+    closed_at: Optional[datetime] = None  # Set when the creator closes it
 
 
 class PollResponse(PollInDB):
@@ -162,4 +175,36 @@ class PollVoteActionInDB(MongoBaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+# Per-user Poll State Schema
+class PollStateRequest(BaseModel):
+    """Data model for asking the caller's state on several polls."""
+
+    poll_ids: List[str] = Field(..., max_length=500)
+
+
+class PollStateResponse(BaseModel):
+    """The caller's votes (poll_id -> option_id) and liked poll ids."""
+
+    votes: Dict[str, str] = Field(default_factory=dict)
+    likes: List[str] = Field(default_factory=list)
+
+
+class PollResultsRequest(BaseModel):
+    """Data model for asking the live counts of several polls."""
+
+    poll_ids: List[str] = Field(..., max_length=500)
+
+
+class PollResultsResponse(BaseModel):
+    """
+    Counts of several polls as parallel arrays: poll_ids[i] has likes[i]
+    likes, and its option option_ids[i][j] has votes[i][j] votes.
+    """
+
+    poll_ids: List[str] = Field(default_factory=list)
+    likes: List[int] = Field(default_factory=list)
+    option_ids: List[List[str]] = Field(default_factory=list)
+    votes: List[List[int]] = Field(default_factory=list)
+
+
 PollResponse.model_rebuild()
@@ -1,9 +1,13 @@
 # routers/polls.py
-from fastapi import APIRouter, HTTPException, status, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime
 from typing import List
 
+# Import settings
+from settings import settings
+
 # Import models
 from models.mongo_models import (
     PollCreate,
@@ -15,6 +19,10 @@ from models.mongo_models import (
     PollOptionInDB,
     PollOptionResponse,
     PollVoteActionInDB,
+    PollStateRequest,
+    PollStateResponse,
+    PollResultsRequest,
+    PollResultsResponse,
 )
 
 # Import auth utilities
@@ -24,23 +32,56 @@ from utils.auth import decode_access_token
 from utils.database import (
     get_all_polls_from_db,
     get_poll_by_id_from_db,
+    get_polls_by_ids_from_db,
+    get_poll_counts_from_db,
+    search_poll_ids_from_db,
     create_poll_in_db,
+    delete_poll_in_db,
     update_poll_likes_in_db,
     get_like_action_from_db,
+    get_liked_poll_ids_from_db,
     create_like_action_in_db,
     delete_like_action_in_db,
     get_options_for_poll_from_db,
+    get_options_for_polls_from_db,
     create_poll_option_in_db,
+    create_poll_options_in_db,
     get_poll_option_by_id_from_db,
     update_poll_option_votes_in_db,
     get_vote_action_by_poll_from_db,
+    get_voted_options_from_db,
     create_vote_action_in_db,
     delete_vote_action_in_db,
+    close_poll_in_db,
 )
 
 # Import websocket manager
 from routers.websocket import manager
 
+# Import request tracing
+from utils.tracing import span
+
+# Import fast response serializers
+from utils.serializers import (
+    poll_to_json,
+    poll_response,
+    polls_response,
+    poll_results_response,
+)
+
+# Import in-memory trending ranking and search index
+from utils.trending import trending
+from utils.search import search_index, text_patterns
+
+# Import closed poll helpers and snapshots
+from utils.polls import closed_poll_snapshots, is_poll_closed, remember_if_closed
+
+# Import per-route rate limits
+from utils.ratelimit import RouteBudget, vote_budget, like_budget, create_budget
+
+# Import negative-lookup filters for like/vote existence checks
+from utils.bloom import like_filter, vote_filter
+
 router = APIRouter(prefix="/polls", tags=["polls"])
 
 # Security scheme for protected routes
@@ -67,16 +108,90 @@ def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(secu
     return user_id
 
 
+# --- Dependency that authenticates and rate limits a write route ---
+def rate_limited(budget: RouteBudget):
+    """
+    Like get_current_user_id, but first spends a token of the caller's IP
+    and then of the user, answering 429 when either budget is exhausted.
+    """
+
+    def current_user_id_within_budget(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+    ):
+        ip = request.client.host if request.client else ""
+        user_id = get_current_user_id(credentials)
+        budget.admit(user_id, ip)
+        return user_id
+
+    return current_user_id_within_budget
+
+
 # Helper function to load poll with options
-async def load_poll_with_options(valid_poll_id: PyObjectId, poll_id_str: str):
-    poll = await get_poll_by_id_from_db(valid_poll_id)
+async def load_poll_with_options(
+    valid_poll_id: PyObjectId, poll_id_str: str, secondary_ok: bool = False
+):
+    poll = await get_poll_by_id_from_db(valid_poll_id, secondary_ok=secondary_ok)
     if not poll:
         return None
     options_list = await get_options_for_poll_from_db(poll_id_str)
     poll["options"] = options_list
+    remember_if_closed(poll)
     return poll
 
 
+# Helper function to reject changes to a closed poll
+def ensure_poll_open(poll: dict):
+    if is_poll_closed(poll):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Poll is closed"
+        )
+
+
+# Helper function to broadcast a poll to every connected client
+async def broadcast_poll(event_type: str, poll: dict):
+    if settings.fast_responses:
+        # Build the JSON-safe dict straight from the BSON document
+        with span("serialize poll"):
+            serializable_data = poll_to_json(poll)
+    else:
+        # Convert to model and dump to JSON-safe dict
+        with span("validate PollResponse"):
+            poll_model = PollResponse(**poll)
+            serializable_data = poll_model.model_dump(mode="json", by_alias=True)
+    await manager.broadcast_json({"type": event_type, "data": serializable_data})
+
+
+# Helper function to load several polls with their options, in the given order
+async def load_polls_with_options(poll_ids: List[str]):
+    # Closed polls are served from their snapshots
+    polls_by_id = {}
+    for poll_id in poll_ids:
+        snapshot = closed_poll_snapshots.get(poll_id)
+        if snapshot is not None:
+            polls_by_id[poll_id] = snapshot
+    missing = [poll_id for poll_id in poll_ids if poll_id not in polls_by_id]
+
+    if missing:
+        valid_ids = [PyObjectId(poll_id) for poll_id in missing]
+        polls = await get_polls_by_ids_from_db(valid_ids)
+        options = await get_options_for_polls_from_db(missing)
+
+        loaded = {str(poll["_id"]): poll for poll in polls}
+        for poll in polls:
+            poll["options"] = []
+        for option in options:
+            poll = loaded.get(option["poll_id"])
+            if poll:
+                poll["options"].append(option)
+        for poll in polls:
+            remember_if_closed(poll)
+        polls_by_id.update(loaded)
+
+    # Polls that no longer exist are skipped
+    return [polls_by_id[pid] for pid in poll_ids if pid in polls_by_id]
+
+
 # POLL OPTIONS
 # Route to create a poll option
 @router.post(
@@ -87,7 +202,7 @@ async def load_poll_with_options(valid_poll_id: PyObjectId, poll_id_str: str):
 async def create_poll_option(
     poll_id: str,
     option_data: PollOptionCreate,
-    user_id: str = Depends(get_current_user_id),
+    user_id: str = Depends(rate_limited(create_budget)),
 ):
     """
     Add an option to a poll.
@@ -113,6 +228,7 @@ async def create_poll_option(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the poll creator can add options",
         )
+    ensure_poll_open(poll)
 
     # Create the new poll option document
     option_doc = PollOptionInDB(
@@ -128,17 +244,12 @@ async def create_poll_option(
 
     if result.inserted_id:
         # Fetch the new option to return it
-        new_option = await get_poll_option_by_id_from_db(result.inserted_id)
+        new_option = await get_poll_option_by_id_from_db(poll_id, result.inserted_id)
 
         # Fetch the *entire* updated poll to broadcast
         updated_poll_dict = await load_poll_with_options(valid_poll_id, poll_id)
         if updated_poll_dict:
-            # Convert to model and dump to JSON
-            poll_model = PollResponse(**updated_poll_dict)
-            serializable_data = poll_model.model_dump(mode="json", by_alias=True)
-            await manager.broadcast_json(
-                {"type": "poll_updated", "data": serializable_data}
-            )
+            await broadcast_poll("poll_updated", updated_poll_dict)
 
         return new_option
 
@@ -153,7 +264,7 @@ async def create_poll_option(
 async def toggle_poll_option_vote(
     poll_id: str,
     option_id: str,
-    user_id: str = Depends(get_current_user_id),
+    user_id: str = Depends(rate_limited(vote_budget)),
 ):
     """
     Toggle a 'vote' on a poll option.
@@ -171,9 +282,18 @@ async def toggle_poll_option_vote(
             detail="Invalid Poll or Option ID format",
         )
 
+    # A closed poll takes no votes (known without a query once snapshotted)
+    if poll_id in closed_poll_snapshots:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Poll is closed"
+        )
+
     # Check if the option exists and belongs to the correct poll
-    option = await get_poll_option_by_id_from_db(valid_option_id)
-    if not option:
+    poll, option = await asyncio.gather(
+        get_poll_by_id_from_db(valid_poll_id),
+        get_poll_option_by_id_from_db(poll_id, valid_option_id),
+    )
+    if not poll or not option:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Poll option not found"
         )
@@ -182,11 +302,16 @@ async def toggle_poll_option_vote(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Option does not belong to this poll",
         )
+    ensure_poll_open(poll)
 
     # Check if the user has an existing vote *on this poll*
-    existing_vote = await get_vote_action_by_poll_from_db(
-        user_id=user_id, poll_id=poll_id
-    )
+    # (skipped when the filter knows the user never voted here)
+    existing_vote = None
+    if vote_filter.might_contain(poll_id, user_id):
+        existing_vote = await get_vote_action_by_poll_from_db(
+            user_id=user_id, poll_id=poll_id
+        )
+        vote_filter.record_lookup(found=existing_vote is not None)
 
     if existing_vote:
         old_option_id_str = existing_vote["poll_option_id"]
@@ -194,16 +319,18 @@ async def toggle_poll_option_vote(
             "poll_option_id_obj"
         ]  # Using PyObjectId from helper
 
-        # Delete the old vote action
-        await delete_vote_action_in_db(existing_vote["_id"])
-
-        # Decrement the old option's vote count
-        await update_poll_option_votes_in_db(old_option_id_obj, -1)
+        # Decrement the old option's vote count, then delete the old vote
+        # action: in that order, the reconciler sees the decrement (via
+        # touched_at) before the action is gone and leaves the option alone
+        await update_poll_option_votes_in_db(poll_id, old_option_id_obj, -1)
+        await delete_vote_action_in_db(poll_id, existing_vote["_id"])
 
         # 3c. Check if the user is un-voting (clicked the same option again)
         if old_option_id_str == option_id:
             # User un-voted. Fetch the updated option and return.
-            updated_option = await get_poll_option_by_id_from_db(valid_option_id)
+            updated_option = await get_poll_option_by_id_from_db(
+                poll_id, valid_option_id
+            )
             return updated_option
 
     # If we are here, it's a new vote or a changed vote.
@@ -216,22 +343,19 @@ async def toggle_poll_option_vote(
     )
     vote_dict = vote_doc.model_dump(by_alias=True, exclude=["id"])
     await create_vote_action_in_db(vote_dict)
+    vote_filter.add(poll_id, user_id)
 
     # Increment the *new* option's vote count
-    await update_poll_option_votes_in_db(valid_option_id, 1)
+    await update_poll_option_votes_in_db(poll_id, valid_option_id, 1)
+    trending.record(poll_id)
 
     # Fetch the newly updated option and return it
-    final_option = await get_poll_option_by_id_from_db(valid_option_id)
+    final_option = await get_poll_option_by_id_from_db(poll_id, valid_option_id)
 
     # Fetch the *entire* updated poll to broadcast
     updated_poll_dict = await load_poll_with_options(valid_poll_id, poll_id)
     if updated_poll_dict:
-        # Convert to model and dump to JSON-safe dict
-        poll_model = PollResponse(**updated_poll_dict)
-        serializable_data = poll_model.model_dump(mode="json", by_alias=True)
-        await manager.broadcast_json(
-            {"type": "poll_updated", "data": serializable_data}
-        )
+        await broadcast_poll("poll_updated", updated_poll_dict)
 
     return final_option
 
@@ -244,7 +368,83 @@ async def get_all_polls():
     Retrieve all polls from the database.
     """
     polls_list = await get_all_polls_from_db()
-    return polls_list
+    return polls_response(polls_list)
+
+
+# Route to fetch the trending polls
+@router.get("/trending", response_model=List[PollResponse])
+async def get_trending_polls(limit: int = Query(10, ge=1, le=100)):
+    """
+    Retrieve the hottest polls, ranked by recent likes and votes.
+    The ranking is kept in memory, so only the returned polls hit the database.
+    """
+    return polls_response(await load_polls_with_options(trending.top(limit)))
+
+
+# Route to search polls by text
+@router.get("/search", response_model=List[PollResponse])
+async def search_polls(
+    q: str = Query(..., min_length=1, max_length=300),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Search polls by their text. The last word is matched as a prefix.
+    Results come from the in-memory index, newest polls first.
+    """
+    if search_index.ready:
+        poll_ids = search_index.search(q, limit)
+    else:
+        # The index is still being built and would miss polls: scan instead
+        patterns = text_patterns(q)
+        poll_ids = await search_poll_ids_from_db(patterns, limit) if patterns else []
+    polls_list = await load_polls_with_options(poll_ids)
+    return polls_response(polls_list)
+
+
+# Route to fetch the caller's votes and likes on several polls
+@router.post("/state", response_model=PollStateResponse)
+async def get_poll_states(
+    state_request: PollStateRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Return which option the user voted for and which polls they liked,
+    for every poll id in the request, using one query per action type.
+    """
+    poll_ids = list(set(state_request.poll_ids))
+    votes = await get_voted_options_from_db(user_id=user_id, poll_ids=poll_ids)
+    likes = await get_liked_poll_ids_from_db(user_id=user_id, poll_ids=poll_ids)
+    return PollStateResponse(votes=votes, likes=likes)
+
+
+# Route to fetch the live counts of several polls
+@router.post("/results", response_model=PollResultsResponse)
+async def get_poll_results(results_request: PollResultsRequest):
+    """
+    Return only the like count of every poll in the request and the vote
+    count of each of its options, as parallel arrays in request order.
+    Closed polls come from their snapshots; the rest are read with one
+    query for the polls and one for their options, without their text.
+    Polls that do not exist are left out.
+    """
+    poll_ids = list(dict.fromkeys(results_request.poll_ids))
+    if not all(PyObjectId.is_valid(poll_id) for poll_id in poll_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Poll ID format"
+        )
+
+    counts_by_id = {}
+    for poll_id in poll_ids:
+        snapshot = closed_poll_snapshots.get(poll_id)
+        if snapshot is not None:
+            counts_by_id[poll_id] = snapshot
+    missing = [PyObjectId(pid) for pid in poll_ids if pid not in counts_by_id]
+    if missing:
+        for counts in await get_poll_counts_from_db(missing):
+            counts_by_id[str(counts["_id"])] = counts
+
+    polls = [counts_by_id[pid] for pid in poll_ids if pid in counts_by_id]
+    return poll_results_response(polls)
 
 
 # Route to fetch poll by id
@@ -261,12 +461,17 @@ async def get_poll_by_id(poll_id: str):
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Poll ID format"
         )
 
-    poll = await load_poll_with_options(valid_id, poll_id)
+    # Closed polls never change, so their snapshot is served as-is
+    snapshot = closed_poll_snapshots.get(poll_id)
+    if snapshot is not None:
+        return poll_response(snapshot)
+
+    poll = await load_poll_with_options(valid_id, poll_id, secondary_ok=True)
     if not poll:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found"
         )
-    return poll
+    return poll_response(poll)
 
 
 # Route to create a poll
@@ -275,19 +480,31 @@ async def get_poll_by_id(poll_id: str):
 )
 async def create_poll(
     poll_data: PollCreate,
-    user_id: str = Depends(get_current_user_id),
+    user_id: str = Depends(rate_limited(create_budget)),
 ):
     """
     Create a new poll. Requires authentication.
 
     - **text**: The poll question/text (min 5, max 280 characters).
+    - **closes_at**: Optional deadline after which the poll takes no more
+      votes or likes.
+    - **options**: Optional list of options, created with the poll and
+      included in the single `poll_created` broadcast.
     """
+    now = datetime.utcnow()
+    if poll_data.closes_at is not None and poll_data.closes_at <= now:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="closes_at must be in the future",
+        )
+
     # Create the PollInDB document
     poll_doc = PollInDB(
         text=poll_data.text,
         creator_id=user_id,
-        created_at=datetime.utcnow(),
+        created_at=now,
         likes=0,
+        closes_at=poll_data.closes_at,
     )
 
     # Convert to dict for database insertion, excluding 'id'
@@ -307,14 +524,36 @@ async def create_poll(
                 detail="Failed to create poll",
             )
 
-        # Broadcast poll creation update
+        # Insert all the options in one round trip (insert_many sets their _id)
+        poll_id = str(result.inserted_id)
+        options_list = [
+            PollOptionInDB(
+                poll_id=poll_id, text=option.text, votes=0, created_at=now
+            ).model_dump(by_alias=True, exclude=["id"])
+            for option in poll_data.options
+        ]
+        if options_list:
+            try:
+                await create_poll_options_in_db(poll_id, options_list)
+            except Exception as e:
+                # Never leave a poll without the options it was created with;
+                # some of them may have been inserted, so remove those too
+                print(f"❌ Failed to create options for poll {poll_id}: {e}")
+                await delete_poll_in_db(result.inserted_id)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to create poll",
+                )
+        new_poll["options"] = options_list
+
+        trending.record(str(result.inserted_id))
+        search_index.add(str(result.inserted_id), new_poll["text"])
+        like_filter.track(str(result.inserted_id))
+        vote_filter.track(str(result.inserted_id))
+
+        # Broadcast poll creation update (one message, options included)
         if new_poll:
-            # Convert to model and dump to JSON-safe dict
-            poll_model = PollResponse(**new_poll)
-            serializable_data = poll_model.model_dump(mode="json", by_alias=True)
-            await manager.broadcast_json(
-                {"type": "poll_created", "data": serializable_data}
-            )
+            await broadcast_poll("poll_created", new_poll)
 
         # Return the poll document, NOT the 'result' object
         return new_poll
@@ -326,7 +565,7 @@ async def create_poll(
 @router.post("/{poll_id}/like", response_model=PollResponse)
 async def toggle_poll_like(
     poll_id: str,
-    user_id: str = Depends(get_current_user_id),
+    user_id: str = Depends(rate_limited(like_budget)),
 ):
     """
     Toggle a 'like' on a poll.
@@ -342,22 +581,32 @@ async def toggle_poll_like(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Poll ID format"
         )
 
+    # A closed poll takes no likes (known without a query once snapshotted)
+    if poll_id in closed_poll_snapshots:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Poll is closed"
+        )
+
     # Check if the poll exists
     poll = await get_poll_by_id_from_db(valid_poll_id)
     if not poll:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found"
         )
+    ensure_poll_open(poll)
 
     # Check if the user has already liked this poll
-    existing_like = await get_like_action_from_db(user_id=user_id, poll_id=poll_id)
+    # (skipped when the filter knows the user never liked it)
+    existing_like = None
+    if like_filter.might_contain(poll_id, user_id):
+        existing_like = await get_like_action_from_db(user_id=user_id, poll_id=poll_id)
+        like_filter.record_lookup(found=existing_like is not None)
 
     if existing_like:
-        # UNLIKE: Delete the like action
-        await delete_like_action_in_db(existing_like["_id"])
-
-        # Decrement the poll's like count
+        # UNLIKE: Decrement the poll's like count, then delete the like
+        # action (decrement first, for the reconciler; see the vote route)
         await update_poll_likes_in_db(valid_poll_id, -1)
+        await delete_like_action_in_db(poll_id, existing_like["_id"])
 
     else:
         # LIKE: Create a new like action document
@@ -368,9 +617,11 @@ async def toggle_poll_like(
         )
         like_dict = like_doc.model_dump(by_alias=True, exclude=["id"])
         await create_like_action_in_db(like_dict)
+        like_filter.add(poll_id, user_id)
 
         # 4b. Increment the poll's like count
         await update_poll_likes_in_db(valid_poll_id, 1)
+        trending.record(poll_id)
 
     updated = await load_poll_with_options(valid_poll_id, poll_id)
     if not updated:
@@ -381,11 +632,48 @@ async def toggle_poll_like(
 
     # Broadcast the updated poll
     if updated:
-        # Convert to model and dump to JSON-safe dict
-        poll_model = PollResponse(**updated)
-        serializable_data = poll_model.model_dump(mode="json", by_alias=True)
-        await manager.broadcast_json(
-            {"type": "poll_updated", "data": serializable_data}
-        )
+        await broadcast_poll("poll_updated", updated)
 
     return updated
+
+
+# Route to close a poll
+@router.post("/{poll_id}/close", response_model=PollResponse)
+async def close_poll(
+    poll_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Close a poll: its votes and likes are frozen from now on.
+    Only the creator of the poll can close it. Closing a closed poll
+    returns it unchanged.
+    """
+    try:
+        valid_poll_id = PyObjectId(poll_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Poll ID format"
+        )
+
+    poll = await get_poll_by_id_from_db(valid_poll_id)
+    if not poll:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found"
+        )
+    if poll["creator_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the poll creator can close it",
+        )
+
+    result = await close_poll_in_db(valid_poll_id, datetime.utcnow())
+    closed = await load_poll_with_options(valid_poll_id, poll_id)
+    if not closed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Poll not found"
+        )
+
+    if result.modified_count:
+        await broadcast_poll("poll_updated", closed)
+
+    return poll_response(closed)
@@ -19,7 +19,8 @@ from utils.auth import (
     decode_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
-from utils.database import get_user_by_email, create_user_in_db
+from utils.database import create_user_in_db, get_user_by_email
+from utils.users import get_cached_user_by_email, remember_user
 from datetime import timedelta
 
 router = APIRouter(prefix="/user", tags=["users"])
@@ -43,7 +44,7 @@ async def register(user_data: UserCreate):
     Returns an access token and user information.
     """
 
-    # Check if user already exists
+    # Check if user already exists (in the database: no cache may be stale here)
     existing_user = await get_user_by_email(user_data.email_id)
     if existing_user:
         raise HTTPException(
@@ -62,18 +63,24 @@ async def register(user_data: UserCreate):
         "created_at": datetime.utcnow(),
     }
 
-    # Insert user into database
-    await create_user_in_db(user_dict)
+    # Insert user into database (None if the email was registered meanwhile)
+    result = await create_user_in_db(user_dict)
 
-    # Retrieve the created user
-    created_user = await get_user_by_email(user_data.email_id)
-
-    if not created_user:
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email already exists",
+        )
+    if not result.inserted_id:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user",
         )
 
+    # The insert gave user_dict its _id; cache it for the next /user/me
+    created_user = user_dict
+    remember_user(created_user)
+
     # Create access token
     access_token = create_access_token(
         data={"sub": user_data.email_id, "user_id": str(created_user["_id"])},
@@ -105,8 +112,8 @@ async def login(credentials: UserLogin):
     Returns an access token and user information.
     """
 
-    # Find user by email
-    user = await get_user_by_email(credentials.email_id)
+    # Find user by email (unknown emails are remembered for a short while)
+    user = await get_cached_user_by_email(credentials.email_id, negative=True)
 
     if not user:
         raise HTTPException(
@@ -164,8 +171,8 @@ async def get_current_user(
             detail="Could not validate credentials",
         )
 
-    # Get user from database
-    user = await get_user_by_email(email)
+    # Get user from the cache, or the database
+    user = await get_cached_user_by_email(email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
@@ -1,34 +1,109 @@
 # routers/websockets.py
+import asyncio
+import random
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import List, Set
+from time import perf_counter
+
+from settings import settings
+from utils.tracing import span
+from utils.serializers import dumps
+from utils.compression import (
+    WS_DEFLATE_SUBPROTOCOL,
+    deflate,
+)
+from utils.metrics import (
+    websocket_connections,
+    websocket_broadcast_duration,
+    websocket_messages_sent_total,
+)
+from utils.shutdown import shutdown_drain
 
 router = APIRouter(prefix="/ws", tags=["websockets"])
 
+# Close code telling clients the server is restarting and to reconnect
+SERVICE_RESTART = 1012
+
 
 class ConnectionManager:
     """Manages active WebSocket connections."""
 
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Connections that take large broadcasts as compressed binary frames
+        self.deflate_connections: Set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         """Accept and store a new connection."""
-        await websocket.accept()
+        if (
+            settings.ws_shared_compression
+            and WS_DEFLATE_SUBPROTOCOL in websocket.scope.get("subprotocols", ())
+        ):
+            await websocket.accept(subprotocol=WS_DEFLATE_SUBPROTOCOL)
+            self.deflate_connections.add(websocket)
+        else:
+            await websocket.accept()
         self.active_connections.append(websocket)
+        websocket_connections.set(len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         """Remove a connection."""
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+        self.deflate_connections.discard(websocket)
+        websocket_connections.set(len(self.active_connections))
 
     async def broadcast_json(self, message: dict):
         """Broadcast a JSON message to all active connections."""
-        for connection in self.active_connections:
+        started = perf_counter()
+        sent = 0
+        with span("broadcast"):
+            # Encode (and compress) once, not once per connection
+            data = dumps(message)
+            text = data.decode()
+            compressed = None
+            if self.deflate_connections and len(data) >= settings.compression_min_bytes:
+                compressed = deflate(data)
+            # Iterate over a copy: failed sockets are removed along the way
+            for connection in list(self.active_connections):
+                try:
+                    if (
+                        compressed is not None
+                        and connection in self.deflate_connections
+                    ):
+                        await connection.send_bytes(compressed)
+                    else:
+                        await connection.send_text(text)
+                    sent += 1
+                except RuntimeError:
+                    # Handle cases where client disconnected unexpectedly
+                    self.disconnect(connection)
+        websocket_messages_sent_total.inc(amount=sent)
+        websocket_broadcast_duration.observe(perf_counter() - started)
+
+    async def close_for_restart(self, spread_seconds: float):
+        """
+        Tell every client to reconnect after a random delay of up to
+        spread_seconds, then close its socket, so they do not all land on
+        the other workers at the same moment.
+        """
+
+        async def close(connection: WebSocket):
+            after_ms = int(random.uniform(0, spread_seconds) * 1000)
+            message = {"type": "reconnect", "data": {"after_ms": after_ms}}
             try:
-                await connection.send_json(message)
-            except RuntimeError:
-                # Handle cases where client disconnected unexpectedly
+                await connection.send_text(dumps(message).decode())
+                await connection.close(code=SERVICE_RESTART)
+            finally:
                 self.disconnect(connection)
 
+        connections = list(self.active_connections)
+        # Closing waits for each client's close frame, so do it concurrently
+        await asyncio.gather(
+            *(close(connection) for connection in connections), return_exceptions=True
+        )
+        print(f"👋 Asked {len(connections)} sockets to reconnect elsewhere.")
+
 
 # Create a single instance of the manager
 manager = ConnectionManager()
@@ -40,6 +115,10 @@ async def websocket_endpoint(websocket: WebSocket):
     The main WebSocket endpoint.
     It accepts a connection and keeps it open.
     """
+    if shutdown_drain.draining:
+        # This worker is shutting down: the client should use another one
+        await websocket.close(code=SERVICE_RESTART)
+        return
     await manager.connect(websocket)
     try:
         while True:
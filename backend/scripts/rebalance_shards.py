@@ -0,0 +1,118 @@
+# scripts/rebalance_shards.py
+"""
+Move every poll (with its options, like/vote actions and action
+archives) to the shard that MONGO_SHARD_URIS now assigns it to.
+
+Shards are picked with jump consistent hashing, so appending a database
+to MONGO_SHARD_URIS only moves about 1/N of the polls, all of them to the
+new database. To start sharding an existing deployment, list the current
+DB_NAME database first and the new databases after it.
+
+Stop the API (or at least its writers) while this runs: a poll that has
+not been copied yet is not found on its new shard. Copies are upserts and
+sources are only deleted after the copy, so an interrupted run can simply
+be started again. From the backend directory:
+
+    python -m scripts.rebalance_shards --dry-run
+    python -m scripts.rebalance_shards
+    python -m scripts.rebalance_shards --drain mongodb://old-host/quickpoll_3
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+
+import dbconn
+from settings import settings
+from utils.sharding import shard_for
+
+# Per-poll collections, keyed by the poll id string
+CHILD_COLLECTIONS = (
+    "poll_options",
+    "poll_like_actions",
+    "poll_vote_actions",
+    "poll_action_archives",
+)
+
+
+async def move_poll(poll: dict, source, target):
+    """Copy a poll and its documents to target, then delete them from source."""
+    poll_id = str(poll["_id"])
+    for name in CHILD_COLLECTIONS:
+        documents = await source[name].find({"poll_id": poll_id}).to_list(None)
+        if documents:
+            await target[name].bulk_write(
+                [
+                    ReplaceOne({"_id": doc["_id"]}, doc, upsert=True)
+                    for doc in documents
+                ],
+                ordered=False,
+            )
+    await target["polls"].replace_one({"_id": poll["_id"]}, poll, upsert=True)
+
+    await source["polls"].delete_one({"_id": poll["_id"]})
+    for name in CHILD_COLLECTIONS:
+        await source[name].delete_many({"poll_id": poll_id})
+
+
+async def rebalance(sources, shards, batch_size: int, dry_run: bool) -> Counter:
+    """Move misplaced polls from each (label, database) source. Returns moves."""
+    moves = Counter()
+    for label, source in sources:
+        after_id = None
+        while True:
+            query = {} if after_id is None else {"_id": {"$gt": after_id}}
+            polls = await source["polls"].find(query).sort("_id", 1).to_list(batch_size)
+            if not polls:
+                break
+            after_id = polls[-1]["_id"]
+            for poll in polls:
+                index = shard_for(poll["_id"], len(shards))
+                if shards[index] is source:
+                    continue
+                moves[(label, index)] += 1
+                if not dry_run:
+                    await move_poll(poll, source, shards[index])
+        print(f"🧩 Scanned {label}.")
+    return moves
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--drain",
+        action="append",
+        default=[],
+        metavar="URI",
+        help="database no longer in MONGO_SHARD_URIS to move every poll out of",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="only count moves")
+    args = parser.parse_args()
+
+    await dbconn.startup_client()
+    drain_clients = [AsyncIOMotorClient(uri) for uri in args.drain]
+    try:
+        shards = dbconn.get_shard_databases()
+        sources = [(f"shard {index}", db) for index, db in enumerate(shards)]
+        sources += [
+            (f"drained {uri}", client.get_default_database(settings.db_name))
+            for uri, client in zip(args.drain, drain_clients)
+        ]
+        moves = await rebalance(sources, shards, args.batch_size, args.dry_run)
+    finally:
+        for client in drain_clients:
+            client.close()
+        dbconn.close_client()
+
+    verb = "Would move" if args.dry_run else "Moved"
+    for (label, index), count in sorted(moves.items()):
+        print(f"{verb} {count} polls from {label} to shard {index}")
+    print(f"{verb} {sum(moves.values())} polls in total.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+# settings.py
+import os
+from typing import List, Mapping, Optional
+
+from dotenv import load_dotenv
+
+
+class Settings:
+    """
+    Every environment variable the backend reads, parsed once at startup.
+
+    Modules read them as settings.<name> when they need them, so scripts
+    and benchmarks can override a value by assigning to it. Values that
+    size something at import time (caches, rate-limit budgets) only take
+    effect if assigned before that module is imported.
+    """
+
+    def __init__(self, env: Mapping[str, str] = os.environ):
+        # --- Database ---
+        # For a local MongoDB, this might be: "mongodb://localhost:27017/"
+        self.mongo_uri: Optional[str] = env.get("MONGO_URI")
+        self.db_name: Optional[str] = env.get("DB_NAME")
+        # "mongo", or "memory" to keep all data in process (benchmarks, soak tests)
+        self.data_backend: str = env.get("DATA_BACKEND", "mongo")
+        # Connection pool bounds (per API worker and per server)
+        self.mongo_max_pool_size = int(env.get("MONGO_MAX_POOL_SIZE", "100"))
+        self.mongo_min_pool_size = int(env.get("MONGO_MIN_POOL_SIZE", "0"))
+        # Deadline for a whole operation, including waiting for a pooled connection.
+        # pymongo sends what is left of it as maxTimeMS, so the server stops
+        # working on queries the client has already given up on. 0 disables it.
+        self.mongo_timeout_ms = int(env.get("MONGO_TIMEOUT_MS", "5000"))
+        # Let list/detail reads go to secondaries that lag the primary by at most
+        # MONGO_MAX_STALENESS_SECONDS (MongoDB requires at least 90)
+        self.mongo_secondary_reads = env.get("MONGO_SECONDARY_READS", "false") == "true"
+        self.mongo_max_staleness_seconds = max(
+            90, int(env.get("MONGO_MAX_STALENESS_SECONDS", "90"))
+        )
+        # Polls and their options and like/vote actions are spread over these
+        # databases by hash of the poll id; users and app state stay in DB_NAME.
+        # Comma-separated URIs, each naming its database in the path. Only ever
+        # append to the list, then run scripts/rebalance_shards.py. Unset means
+        # all polls live in DB_NAME.
+        self.mongo_shard_uris: List[str] = [
+            uri
+            for uri in (
+                part.strip() for part in env.get("MONGO_SHARD_URIS", "").split(",")
+            )
+            if uri
+        ]
+        # Ping every MongoDB server before serving. Without it a worker starts
+        # one round trip sooner, and index creation at startup is the first
+        # command to fail when MongoDB is unreachable.
+        self.mongo_startup_ping = env.get("MONGO_STARTUP_PING", "true") == "true"
+
+        # --- HTTP ---
+        self.frontend_url: Optional[str] = env.get("FRONTEND_URL")
+        # Serve poll reads straight from the BSON documents, skipping the
+        # re-validation FastAPI's response_model would do. Data written through
+        # the API has already been validated on the way in.
+        self.fast_responses = env.get("FAST_RESPONSES", "true") == "true"
+        # Responses and broadcasts smaller than this are sent uncompressed
+        self.compression_min_bytes = int(env.get("COMPRESSION_MIN_BYTES", "500"))
+        self.gzip_level = int(env.get("GZIP_LEVEL", "6"))
+        self.brotli_quality = int(env.get("BROTLI_QUALITY", "4"))
+        # Compress each broadcast once for every /ws client that asks for it
+        self.ws_shared_compression = env.get("WS_SHARED_COMPRESSION", "true") == "true"
+
+        # --- Auth ---
+        self.secret_key: Optional[str] = env.get("SECRET_KEY")
+
+        # --- Caches ---
+        # Users kept in memory per worker (so /user/me skips MongoDB), and for how long
+        self.user_cache_size = int(env.get("USER_CACHE_SIZE", "10000"))
+        self.user_cache_ttl_seconds = float(env.get("USER_CACHE_TTL_SECONDS", "300"))
+        # How long an email is remembered as unknown. Keep it short: another worker
+        # may register that email meanwhile, and login here 404s until it expires.
+        self.user_negative_cache_ttl_seconds = float(
+            env.get("USER_NEGATIVE_CACHE_TTL_SECONDS", "30")
+        )
+        # Closed polls (with their options) kept in memory per worker, and for how long
+        self.closed_poll_cache_size = int(env.get("CLOSED_POLL_CACHE_SIZE", "10000"))
+        self.closed_poll_cache_ttl_seconds = float(
+            env.get("CLOSED_POLL_CACHE_TTL_SECONDS", "3600")
+        )
+        # Off by default: the filters only see writes made by this process, so
+        # they are only safe to enable when the API runs as a single worker
+        self.action_filter_enabled = env.get("ACTION_FILTER_ENABLED", "false") == "true"
+        # Target false-positive rate of each filter
+        self.action_filter_error_rate = float(
+            env.get("ACTION_FILTER_ERROR_RATE", "0.01")
+        )
+
+        # --- Rate limiting ---
+        self.rate_limit_enabled = env.get("RATE_LIMIT_ENABLED", "true") == "true"
+        # Per-user budgets: sustained requests per second, and the burst on top
+        self.rate_limit_vote_per_second = float(
+            env.get("RATE_LIMIT_VOTE_PER_SECOND", "2")
+        )
+        self.rate_limit_vote_burst = float(env.get("RATE_LIMIT_VOTE_BURST", "10"))
+        self.rate_limit_like_per_second = float(
+            env.get("RATE_LIMIT_LIKE_PER_SECOND", "2")
+        )
+        self.rate_limit_like_burst = float(env.get("RATE_LIMIT_LIKE_BURST", "10"))
+        self.rate_limit_create_per_second = float(
+            env.get("RATE_LIMIT_CREATE_PER_SECOND", "0.2")
+        )
+        self.rate_limit_create_burst = float(env.get("RATE_LIMIT_CREATE_BURST", "10"))
+        # An IP (possibly many users behind one NAT) gets this many times a user's budget
+        self.rate_limit_ip_multiplier = float(env.get("RATE_LIMIT_IP_MULTIPLIER", "10"))
+        # Buckets kept per budget; the least recently seen key is dropped beyond it
+        self.rate_limit_max_keys = int(env.get("RATE_LIMIT_MAX_KEYS", "100000"))
+        # HTTP requests a worker handles at once before answering 503 (0 disables)
+        self.max_in_flight_requests = int(env.get("MAX_IN_FLIGHT_REQUESTS", "500"))
+
+        # --- Idempotency ---
+        # How long a response is replayed for retries with the same Idempotency-Key
+        self.idempotency_ttl_seconds = float(env.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+        # Responses kept in memory per worker
+        self.idempotency_cache_size = int(env.get("IDEMPOTENCY_CACHE_SIZE", "10000"))
+        # "memory" (per worker) or "database" (shared by every worker)
+        self.idempotency_store = env.get("IDEMPOTENCY_STORE", "memory")
+
+        # --- Trending ---
+        # How quickly activity stops counting towards a poll's trending score
+        self.trending_half_life_hours = float(env.get("TRENDING_HALF_LIFE_HOURS", "6"))
+        # How often dirty scores are written back to MongoDB
+        self.trending_checkpoint_seconds = float(
+            env.get("TRENDING_CHECKPOINT_SECONDS", "60")
+        )
+        # How many of the top stored scores are loaded into memory, at startup
+        # and after every checkpoint (which brings in the other workers' activity)
+        self.trending_load_limit = int(env.get("TRENDING_LOAD_LIMIT", "10000"))
+        # Polls ranked in memory per worker; the coldest are dropped beyond it
+        self.trending_max_polls = int(env.get("TRENDING_MAX_POLLS", "10000"))
+
+        # --- Counter reconciler ---
+        # Every worker may run the job safely (fixes are conditional), but one is enough
+        self.reconcile_enabled = env.get("RECONCILE_ENABLED", "true") == "true"
+        # How often polls touched since the last run are re-checked
+        self.reconcile_interval_seconds = float(
+            env.get("RECONCILE_INTERVAL_SECONDS", "300")
+        )
+        # How often every poll is re-checked (0 disables full recounts)
+        self.reconcile_full_every_hours = float(
+            env.get("RECONCILE_FULL_EVERY_HOURS", "24")
+        )
+        # Polls per batch, and the pause between batches that keeps load bounded
+        self.reconcile_batch_size = int(env.get("RECONCILE_BATCH_SIZE", "100"))
+        self.reconcile_batch_pause_seconds = float(
+            env.get("RECONCILE_BATCH_PAUSE_SECONDS", "0.5")
+        )
+        # Writes this recent may still be in flight (action written, counter not
+        # yet), so the watermark trails the clock by this much
+        self.reconcile_settle_seconds = float(env.get("RECONCILE_SETTLE_SECONDS", "30"))
+        # How far back an incremental run looks without a stored watermark, or
+        # when the stored one is older; older drift is left to the full recount
+        self.reconcile_max_lookback_hours = float(
+            env.get("RECONCILE_MAX_LOOKBACK_HOURS", "24")
+        )
+
+        # --- Action archiver ---
+        self.archive_enabled = env.get("ARCHIVE_ENABLED", "true") == "true"
+        # Actions of polls closed longer ago than this leave the hot collections
+        self.archive_after_days = float(env.get("ARCHIVE_AFTER_DAYS", "30"))
+        self.archive_interval_seconds = float(
+            env.get("ARCHIVE_INTERVAL_SECONDS", "3600")
+        )
+        # Polls per batch, and the pause between batches that keeps load bounded
+        self.archive_batch_size = int(env.get("ARCHIVE_BATCH_SIZE", "50"))
+        self.archive_batch_pause_seconds = float(
+            env.get("ARCHIVE_BATCH_PAUSE_SECONDS", "1")
+        )
+        # Write archives as files under this directory instead of into the
+        # poll_action_archives collection of the poll's database
+        self.archive_dir: Optional[str] = env.get("ARCHIVE_DIR")
+
+        # --- Shutdown ---
+        # From SIGTERM, how long the worker has to drain (finish requests, move
+        # /ws clients off) and shut down, including closing MongoDB
+        self.drain_timeout_seconds = float(env.get("DRAIN_TIMEOUT_SECONDS", "20"))
+        # /ws clients are told to reconnect after a random delay up to this, so
+        # the surviving workers see them arrive gradually
+        self.drain_reconnect_spread_seconds = float(
+            env.get("DRAIN_RECONNECT_SPREAD_SECONDS", "10")
+        )
+
+        # --- Observability ---
+        # Fraction of requests that are traced (0 disables tracing entirely)
+        self.trace_sample_rate = float(env.get("TRACE_SAMPLE_RATE", "0.05"))
+        # Traced requests slower than this are written to the slow log
+        self.slow_request_ms = float(env.get("SLOW_REQUEST_MS", "250"))
+        # Print how long each import and lifespan step of startup took
+        self.startup_profile = env.get("STARTUP_PROFILE", "false") == "true"
+
+
+# Load env variables (once, for every module)
+load_dotenv()
+
+# Shared settings instance for the app
+settings = Settings()
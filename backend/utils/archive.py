@@ -0,0 +1,162 @@
+# utils/archive.py
+import asyncio
+import gzip
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from uuid import uuid4
+
+from bson import Binary, encode
+
+from settings import settings
+from utils.database import (
+    get_polls_to_archive_from_db,
+    claim_poll_archive_in_db,
+    iter_actions_for_poll_from_db,
+    save_action_archive_in_db,
+    delete_actions_for_poll_in_db,
+    set_poll_archive_state_in_db,
+)
+from utils.repository import ACTION_COLLECTIONS
+
+# Actions per archive document (and per read), well below MongoDB's 16 MB
+# document limit; archiving a poll never holds more than this in memory
+_ACTIONS_PER_CHUNK = 20000
+# How long a worker's claim on a poll keeps other workers from archiving
+# it. Far longer than archiving a poll takes; if it ever runs out, both
+# workers write the same chunks (upserts) or replace the same file.
+_CLAIM_SECONDS = 3600
+
+
+def _compress(documents: List[dict]) -> bytes:
+    # Concatenated BSON, gzipped: the format of `mongodump --gzip` files,
+    # so `bsondump` and bson.decode_all(gzip.decompress(data)) can read it
+    return gzip.compress(b"".join(encode(doc) for doc in documents))
+
+
+async def _chunks(documents: AsyncIterator[dict]) -> AsyncIterator[List[dict]]:
+    chunk = []
+    async for document in documents:
+        chunk.append(document)
+        if len(chunk) == _ACTIONS_PER_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _open_temp_file(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique, so two writers of the same archive never share a temp file
+    return open(f"{path}.{uuid4().hex}.tmp", "wb")
+
+
+def _finish_file(archive_file, path: str):
+    # Write then rename, so a crash never leaves a truncated archive behind
+    archive_file.flush()
+    os.fsync(archive_file.fileno())
+    archive_file.close()
+    os.replace(archive_file.name, path)
+
+
+async def _save_file(poll_id: str, name: str):
+    path = os.path.join(settings.archive_dir, poll_id, f"{name}.bson.gz")
+    archive_file = await asyncio.to_thread(_open_temp_file, path)
+    try:
+        written = False
+        async for chunk in _chunks(iter_actions_for_poll_from_db(poll_id, name)):
+            # Concatenated gzip members decompress as one stream
+            data = await asyncio.to_thread(_compress, chunk)
+            await asyncio.to_thread(archive_file.write, data)
+            written = True
+        if not written:
+            await asyncio.to_thread(archive_file.write, _compress([]))
+        await asyncio.to_thread(_finish_file, archive_file, path)
+    except BaseException:
+        archive_file.close()
+        os.unlink(archive_file.name)
+        raise
+
+
+async def _save_chunks(poll_id: str, name: str):
+    index = 0
+    async for chunk in _chunks(iter_actions_for_poll_from_db(poll_id, name)):
+        data = await asyncio.to_thread(_compress, chunk)
+        await save_action_archive_in_db(
+            poll_id,
+            {
+                "_id": f"{poll_id}:{name}:{index}",
+                "poll_id": poll_id,
+                "collection": name,
+                "count": len(chunk),
+                "data": Binary(data),
+            },
+        )
+        index += 1
+
+
+async def _save_archive(poll_id: str):
+    for name in ACTION_COLLECTIONS:
+        if settings.archive_dir:
+            await _save_file(poll_id, name)
+        else:
+            await _save_chunks(poll_id, name)
+
+
+async def archive_poll(poll: dict) -> Optional[int]:
+    """
+    Move a closed poll's like/vote actions to cold storage. Returns how
+    many actions left the hot collections.
+
+    Closed polls take no new actions, so the archive is written once and
+    marked with archived_at before anything is deleted; purged_at then
+    records that the hot copies are gone. The poll is claimed first, so
+    only one worker archives it; a poll claimed elsewhere is skipped
+    (returns None). A run interrupted at any step is finished by the
+    first run after its claim expires.
+    """
+    poll_id = str(poll["_id"])
+    until = datetime.utcnow() + timedelta(seconds=_CLAIM_SECONDS)
+    claim = await claim_poll_archive_in_db(poll["_id"], until)
+    if not claim.modified_count:
+        return None
+    if poll.get("archived_at") is None:
+        await _save_archive(poll_id)
+        await set_poll_archive_state_in_db(
+            poll["_id"], {"archived_at": datetime.utcnow()}
+        )
+    deleted = await delete_actions_for_poll_in_db(poll_id)
+    await set_poll_archive_state_in_db(poll["_id"], {"purged_at": datetime.utcnow()})
+    return deleted
+
+
+async def archive_closed_polls() -> dict:
+    """Archive every poll closed more than ARCHIVE_AFTER_DAYS ago."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.archive_after_days)
+    polls_archived = 0
+    actions_moved = 0
+    while True:
+        polls = await get_polls_to_archive_from_db(cutoff, settings.archive_batch_size)
+        if not polls:
+            break
+        for poll in polls:
+            moved = await archive_poll(poll)
+            if moved is not None:
+                actions_moved += moved
+                polls_archived += 1
+        # Rate limit so a big backlog never competes with foreground requests
+        await asyncio.sleep(settings.archive_batch_pause_seconds)
+    if polls_archived:
+        print(f"🗄️ Archived {actions_moved} actions of {polls_archived} closed polls.")
+    return {"polls_archived": polls_archived, "actions_moved": actions_moved}
+
+
+async def run_action_archiver():
+    """Background task: periodically archive the actions of old closed polls."""
+    while True:
+        await asyncio.sleep(settings.archive_interval_seconds)
+        try:
+            await archive_closed_polls()
+        except Exception as e:
+            # Try again next interval rather than killing the task
+            print(f"❌ Action archival failed: {e}")
@@ -1,44 +1,53 @@
 # utils/auth.py
-from pwdlib import PasswordHash
-from pwdlib.hashers.argon2 import Argon2Hasher
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 from fastapi import HTTPException, status
-from dotenv import load_dotenv
-import os
 
-# Load env variables
-load_dotenv()
+from settings import settings
 
-# Password hashing configuration using pwdlib
-pwd_hash = PasswordHash(
-    (
-        Argon2Hasher(),
-    )
-)
+# pwdlib/argon2 and jose are imported on first use, not at startup: they
+# add about a tenth of a second to every worker's cold start
+
+# Password hashing configuration using pwdlib (created on first use)
+_pwd_hash = None
 
 # JWT Configuration
-SECRET_KEY: Optional[str] = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 3000
 
 
+def get_password_hash():
+    """Return the shared pwdlib PasswordHash, creating it on first use."""
+    global _pwd_hash
+    if _pwd_hash is None:
+        from pwdlib import PasswordHash
+        from pwdlib.hashers.argon2 import Argon2Hasher
+
+        _pwd_hash = PasswordHash(
+            (
+                Argon2Hasher(),
+            )
+        )
+    return _pwd_hash
+
+
 # Password Hashing
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_hash.hash(password)
+    return get_password_hash().hash(password)
 
 
 # Password Verification
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return pwd_hash.verify(plain_password, hashed_password)
+    return get_password_hash().verify(plain_password, hashed_password)
 
 
 # JWT Token Generation
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -46,15 +55,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 # JWT Token Verification
 def decode_access_token(token: str) -> dict:
     """Decode and verify a JWT token."""
+    from jose import JWTError, jwt
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         raise HTTPException(
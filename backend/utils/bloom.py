@@ -0,0 +1,160 @@
+# utils/bloom.py
+import math
+from hashlib import blake2b
+from typing import AsyncIterable, Dict, List
+
+from settings import settings
+
+# Users a poll's filter is sized for before it grows another layer
+ACTION_FILTER_INITIAL_CAPACITY = 32
+
+
+def _hash_pair(key: str):
+    """Two independent 64-bit hashes of key, for double hashing."""
+    digest = blake2b(key.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, hashes):
+        h1, h2 = hashes
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, hashes):
+        for position in self._positions(hashes):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, hashes) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(hashes)
+        )
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that adds a larger layer whenever the current one is full,
+    so it keeps its error rate no matter how many users act on a poll.
+    """
+
+    def __init__(self, error_rate: float):
+        self.error_rate = error_rate
+        self.layers: List[BloomFilter] = [
+            BloomFilter(ACTION_FILTER_INITIAL_CAPACITY, error_rate / 2)
+        ]
+
+    def add(self, hashes):
+        layer = self.layers[-1]
+        if layer.count >= layer.capacity:
+            # Tighten each new layer so the overall error rate stays bounded
+            layer = BloomFilter(
+                layer.capacity * 2, self.error_rate / 2 ** (len(self.layers) + 1)
+            )
+            self.layers.append(layer)
+        layer.add(hashes)
+
+    def __contains__(self, hashes) -> bool:
+        return any(hashes in layer for layer in self.layers)
+
+
+class ActionFilter:
+    """
+    Per-poll filters over the user ids that liked (or voted on) each poll.
+
+    "No" answers are exact, so the database lookup can be skipped;
+    "maybe" answers still need the query. Until the filters are built
+    (or when disabled) every answer is "maybe".
+    """
+
+    def __init__(self, name: str, enabled: bool = settings.action_filter_enabled):
+        self.name = name
+        self.enabled = enabled
+        self.ready = False
+        self.filters: Dict[str, ScalableBloomFilter] = {}
+        # Counters for the stats report
+        self.skipped = 0
+        self.lookups = 0
+        self.false_positives = 0
+
+    def _filter(self, poll_id: str) -> ScalableBloomFilter:
+        poll_filter = self.filters.get(poll_id)
+        if poll_filter is None:
+            poll_filter = self.filters[poll_id] = ScalableBloomFilter(
+                settings.action_filter_error_rate
+            )
+        return poll_filter
+
+    def track(self, poll_id: str):
+        """Start filtering a poll that has no actions yet (e.g. a new poll)."""
+        if self.enabled:
+            self._filter(poll_id)
+
+    def add(self, poll_id: str, user_id: str):
+        """Record that user_id now has an action on poll_id."""
+        if self.enabled:
+            self._filter(poll_id).add(_hash_pair(user_id))
+
+    def might_contain(self, poll_id: str, user_id: str) -> bool:
+        """False only if user_id definitely has no action on poll_id."""
+        if not self.ready:
+            return True
+        poll_filter = self.filters.get(poll_id)
+        if poll_filter is not None and _hash_pair(user_id) not in poll_filter:
+            self.skipped += 1
+            return False
+        return True
+
+    def record_lookup(self, found: bool):
+        """
+        Report the result of a lookup the filter could not rule out.
+        Misses count as false positives; this includes users who un-liked or
+        un-voted, since entries cannot be removed from a Bloom filter.
+        """
+        if not self.ready:
+            return
+        self.lookups += 1
+        if not found:
+            self.false_positives += 1
+
+    async def build(self, poll_ids: AsyncIterable[dict], actions: AsyncIterable[dict]):
+        """Rebuild every filter from the polls and their action documents."""
+        if not self.enabled:
+            return
+        async for poll in poll_ids:
+            self._filter(str(poll["_id"]))
+        count = 0
+        async for action in actions:
+            self.add(action["poll_id"], action["user_id"])
+            count += 1
+        self.ready = True
+        print(
+            f"🌸 Built {self.name} filters for {len(self.filters)} polls ({count} actions)."
+        )
+
+    def stats(self) -> dict:
+        """Queries saved and observed false-positive rate."""
+        negatives = self.skipped + self.false_positives
+        return {
+            "polls": len(self.filters),
+            "queries_saved": self.skipped,
+            "queries_run": self.lookups,
+            "false_positives": self.false_positives,
+            "false_positive_rate": (
+                self.false_positives / negatives if negatives else 0.0
+            ),
+        }
+
+
+# Create a single instance per action collection
+like_filter = ActionFilter("likes")
+vote_filter = ActionFilter("votes")
@@ -0,0 +1,66 @@
+# utils/compression.py
+import zlib
+from typing import Optional
+
+from settings import settings
+
+try:
+    # Optional, better ratio than gzip for JSON
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+# Subprotocol a /ws client offers to receive large broadcasts as binary
+# frames holding zlib-compressed JSON (DecompressionStream("deflate"))
+WS_DEFLATE_SUBPROTOCOL = "quickpoll.deflate"
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br (when installed) or gzip from an Accept-Encoding header."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a whole body with the encoding from choose_encoding()."""
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.brotli_quality)
+    compressor = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    """Compresses a body sent in several chunks, flushing after each one."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.brotli_quality)
+        else:
+            self._brotli = None
+            self._gzip = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes, last: bool) -> bytes:
+        if self._brotli is not None:
+            data = self._brotli.process(chunk)
+            return data + (self._brotli.finish() if last else self._brotli.flush())
+        data = self._gzip.compress(chunk)
+        return data + self._gzip.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def deflate(data: bytes) -> bytes:
+    """zlib-compress a WebSocket broadcast for WS_DEFLATE_SUBPROTOCOL clients."""
+    return zlib.compress(data, settings.gzip_level)
@@ -1,161 +1,404 @@
 # utils/database.py
-from motor.motor_asyncio import AsyncIOMotorClient
-from dbconn import get_database
+from datetime import datetime
+from typing import Optional
+
 from models.mongo_models import PyObjectId
+from settings import settings
+from utils.repository import Repository
+from utils.tracing import traced
+
+# Shared repository instance for the app (created on first use)
+_repository: Optional[Repository] = None
+
+
+def get_repository() -> Repository:
+    """Return the repository for the configured DATA_BACKEND."""
+    global _repository
+    if _repository is None:
+        # Only the configured backend is imported (pymongo is slow to import)
+        if settings.data_backend == "memory":
+            from utils.memory_repository import InMemoryRepository
+
+            _repository = InMemoryRepository()
+        else:
+            from utils.motor_repository import MotorRepository
+
+            _repository = MotorRepository()
+    return _repository
+
+
+# INDEXES
+async def ensure_indexes():
+    """Create the indexes the lookups below rely on (no-op if they exist)."""
+    return await get_repository().ensure_indexes()
 
 
 # USER
 # Get a user from the database by email
+@traced
 async def get_user_by_email(email: str):
     """Get a user from the database by email."""
-    db = get_database()
-    users_collection = db["users"]
-    user = await users_collection.find_one({"email_id": email})
-    return user
+    return await get_repository().get_user_by_email(email)
 
 
 # Insert a new user into the database
+@traced
 async def create_user_in_db(user_data: dict):
-    """Insert a new user into the database."""
-    db = get_database()
-    users_collection = db["users"]
-    result = await users_collection.insert_one(user_data)
-    return result
+    """Insert a new user into the database (None if the email is taken)."""
+    return await get_repository().create_user(user_data)
 
 
 # POLL
 # Get all polls from the database
+@traced
 async def get_all_polls_from_db():
-    """Get all polls from the database."""
-    db = get_database()
-    polls_collection = db["polls"]
-    polls = await polls_collection.find().to_list(100)
-    return polls
+    """Get all polls from the database (possibly from a secondary)."""
+    return await get_repository().get_all_polls()
 
 
 # Get a poll from the database by id
-async def get_poll_by_id_from_db(poll_id: str):
-    """Get a poll from the database by id."""
-    db = get_database()
-    polls_collection = db["polls"]
-    poll = await polls_collection.find_one({"_id": poll_id})
-    return poll
+@traced
+async def get_poll_by_id_from_db(poll_id: str, secondary_ok: bool = False):
+    """
+    Get a poll from the database by id. With secondary_ok the read may be
+    served by a secondary (see MONGO_SECONDARY_READS); leave it off when
+    the poll was just written, e.g. in the like/vote toggles.
+    """
+    return await get_repository().get_poll_by_id(poll_id, secondary_ok=secondary_ok)
+
+
+# Get several polls from the database by id (in no particular order)
+@traced
+async def get_polls_by_ids_from_db(poll_ids: list):
+    """Get several polls from the database by id."""
+    return await get_repository().get_polls_by_ids(poll_ids)
+
+
+# Get the like and vote counts of several polls (in no particular order)
+@traced
+async def get_poll_counts_from_db(poll_ids: list):
+    """
+    Get only the counts of several polls, without their text:
+    [{_id, likes, options: [{_id, votes}]}], options in creation order.
+    """
+    return await get_repository().get_poll_counts(poll_ids)
+
+
+# Find polls whose text matches every pattern, newest first
+@traced
+async def search_poll_ids_from_db(patterns: list, limit: int):
+    """
+    Get up to limit ids (str) of the newest polls whose text matches every
+    regex in patterns, case-insensitively. Scans every poll text, so it is
+    only meant for while the in-memory search index is being built.
+    """
+    return await get_repository().search_poll_ids(patterns, limit)
+
+
+# Stream the text of every poll, oldest first
+def iter_poll_texts_from_db():
+    """Yield {_id, text} for every poll without loading them all at once."""
+    return get_repository().iter_poll_texts()
+
+
+# Stream the id of every poll
+def iter_poll_ids_from_db():
+    """Yield {_id} for every poll without loading them all at once."""
+    return get_repository().iter_poll_ids()
 
 
 # Insert a new poll into the database
+@traced
 async def create_poll_in_db(poll_data: dict):
     """Insert a new poll into the database."""
-    db = get_database()
-    polls_collection = db["polls"]
-    result = await polls_collection.insert_one(poll_data)
-    return result
+    return await get_repository().create_poll(poll_data)
+
+
+# Delete a poll and its options
+@traced
+async def delete_poll_in_db(poll_id: PyObjectId):
+    """Delete a poll and its options."""
+    return await get_repository().delete_poll(poll_id)
 
 
 # Update a poll's like count
+@traced
 async def update_poll_likes_in_db(poll_id: str, increment: int):
     """Update a poll's like count."""
-    db = get_database()
-    polls_collection = db["polls"]
-    result = await polls_collection.update_one(
-        {"_id": poll_id}, {"$inc": {"likes": increment}}
-    )
-    return result
+    return await get_repository().update_poll_likes(poll_id, increment)
 
 
 # POLL LIKE ACTION
+@traced
 async def get_like_action_from_db(user_id: str, poll_id: str):
     """Find if a specific user has liked a specific poll."""
-    db = get_database()
-    poll_like_actions_collection = db["poll_like_actions"]
-    like_action = await poll_like_actions_collection.find_one(
-        {"user_id": user_id, "poll_id": poll_id}
-    )
-    return like_action
+    return await get_repository().get_like_action(user_id, poll_id)
+
+
+@traced
+async def get_liked_poll_ids_from_db(user_id: str, poll_ids: list):
+    """Return the subset of poll_ids that a user has liked."""
+    return await get_repository().get_liked_poll_ids(user_id, poll_ids)
+
+
+# Stream the (poll_id, user_id) pair of every like action
+def iter_like_actions_from_db():
+    """Yield {poll_id, user_id} for every like action."""
+    return get_repository().iter_like_actions()
 
 
 # Insert a new poll like action into the database
+@traced
 async def create_like_action_in_db(like_data: dict):
     """Insert a new poll like action into the database."""
-    db = get_database()
-    poll_like_actions_collection = db["poll_like_actions"]
-    result = await poll_like_actions_collection.insert_one(like_data)
-    return result
+    return await get_repository().create_like_action(like_data)
 
 
 # Delete a poll like action from the database by its _id
-async def delete_like_action_in_db(like_id: PyObjectId):
+@traced
+async def delete_like_action_in_db(poll_id: str, like_id: PyObjectId):
     """Delete a poll like action from the database by its _id."""
-    db = get_database()
-    poll_like_actions_collection = db["poll_like_actions"]
-    result = await poll_like_actions_collection.delete_one({"_id": like_id})
-    return result
+    return await get_repository().delete_like_action(poll_id, like_id)
 
 
 # POLL OPTION
+@traced
 async def create_poll_option_in_db(option_data: dict):
     """Insert a new poll option into the database."""
-    db = get_database()
-    poll_options_collection = db["poll_options"]
-    result = await poll_options_collection.insert_one(option_data)
-    return result
+    return await get_repository().create_poll_option(option_data)
 
 
-async def get_poll_option_by_id_from_db(option_id: PyObjectId):
-    """Get a poll option from the database by id."""
-    db = get_database()
-    poll_options_collection = db["poll_options"]
-    option = await poll_options_collection.find_one({"_id": option_id})
-    return option
+@traced
+async def create_poll_options_in_db(poll_id: str, options_data: list):
+    """Insert several options of one poll into the database at once."""
+    return await get_repository().create_poll_options(poll_id, options_data)
 
 
-async def update_poll_option_votes_in_db(option_id: PyObjectId, increment: int):
+@traced
+async def get_poll_option_by_id_from_db(poll_id: str, option_id: PyObjectId):
+    """Get an option of a poll from the database by id."""
+    return await get_repository().get_poll_option_by_id(poll_id, option_id)
+
+
+@traced
+async def update_poll_option_votes_in_db(
+    poll_id: str, option_id: PyObjectId, increment: int
+):
     """Update a poll option's vote count."""
-    db = get_database()
-    poll_options_collection = db["poll_options"]
-    result = await poll_options_collection.update_one(
-        {"_id": option_id}, {"$inc": {"votes": increment}}
+    return await get_repository().update_poll_option_votes(
+        poll_id, option_id, increment
     )
-    return result
 
 
+@traced
 async def get_options_for_poll_from_db(poll_id: str):
     """Get all options for a specific poll by poll_id (string)."""
-    db = get_database()
-    poll_options_collection = db["poll_options"]
-    # Find all options matching the poll_id, return as a list
-    # Using .to_list(None) fetches all documents
-    options = await poll_options_collection.find({"poll_id": poll_id}).to_list(None)
-    return options
+    return await get_repository().get_options_for_poll(poll_id)
+
+
+@traced
+async def get_options_for_polls_from_db(poll_ids: list):
+    """Get all options for several polls by poll_id (strings)."""
+    return await get_repository().get_options_for_polls(poll_ids)
 
 
 # POLL VOTE ACTION
+@traced
 async def get_vote_action_by_poll_from_db(user_id: str, poll_id: str):
     """
     Find if a user has already voted on *any* option in this poll.
     Returns the single vote action document if it exists.
     """
-    db = get_database()
-    poll_vote_actions_collection = db["poll_vote_actions"]
-    vote_action = await poll_vote_actions_collection.find_one(
-        {"user_id": user_id, "poll_id": poll_id}
-    )
+    vote_action = await get_repository().get_vote_action_by_poll(user_id, poll_id)
     # Also add the PyObjectId version for convenience in the router
     if vote_action:
         vote_action["poll_option_id_obj"] = PyObjectId(vote_action["poll_option_id"])
     return vote_action
 
 
+@traced
+async def get_voted_options_from_db(user_id: str, poll_ids: list):
+    """Return {poll_id: poll_option_id} for a user's votes on several polls."""
+    return await get_repository().get_voted_options(user_id, poll_ids)
+
+
+def iter_vote_actions_from_db():
+    """Yield {poll_id, user_id} for every vote action."""
+    return get_repository().iter_vote_actions()
+
+
+@traced
 async def create_vote_action_in_db(vote_data: dict):
     """Insert a new poll vote action into the database."""
-    db = get_database()
-    poll_vote_actions_collection = db["poll_vote_actions"]
-    result = await poll_vote_actions_collection.insert_one(vote_data)
-    return result
+    return await get_repository().create_vote_action(vote_data)
 
 
-async def delete_vote_action_in_db(vote_id: PyObjectId):
+@traced
+async def delete_vote_action_in_db(poll_id: str, vote_id: PyObjectId):
     """Delete a poll vote action from the database by its _id."""
-    db = get_database()
-    poll_vote_actions_collection = db["poll_vote_actions"]
-    result = await poll_vote_actions_collection.delete_one({"_id": vote_id})
-    return result
+    return await get_repository().delete_vote_action(poll_id, vote_id)
+
+
+# POLL TRENDING SCORES
+@traced
+async def get_trending_scores_from_db(limit: int):
+    """Get the highest checkpointed trending scores."""
+    return await get_repository().get_trending_scores(limit)
+
+
+@traced
+async def add_trending_scores_in_db(entries: list):
+    """
+    Add (poll_id, log_score) increments to the trending checkpoint, which
+    every worker adds its own activity to. Scores are stored as logs, so
+    each stored value becomes log(exp(stored) + exp(increment)).
+    """
+    if not entries:
+        return None
+    return await get_repository().add_trending_scores(entries)
+
+
+@traced
+async def delete_trending_scores_below_in_db(log_score: float):
+    """Delete the checkpointed trending scores lower than log_score."""
+    return await get_repository().delete_trending_scores_below(log_score)
+
+
+# COUNTER RECONCILIATION
+@traced
+async def get_maintenance_state_from_db(job: str):
+    """Get the stored state (watermark, last report) of a maintenance job."""
+    return await get_repository().get_maintenance_state(job)
+
+
+@traced
+async def save_maintenance_state_in_db(job: str, state: dict):
+    """Store the state of a maintenance job."""
+    return await get_repository().save_maintenance_state(job, state)
+
+
+@traced
+async def get_touched_poll_ids_from_db(since: datetime, until: datetime):
+    """
+    Ids of polls whose counters or actions changed in [since, until):
+    polls/options with a counter update, plus polls with new actions.
+    """
+    return await get_repository().get_touched_poll_ids(since, until)
+
+
+@traced
+async def get_poll_ids_page_from_db(after_id, limit: int):
+    """Get up to limit poll ids greater than after_id, in _id order."""
+    return await get_repository().get_poll_ids_page(after_id, limit)
+
+
+@traced
+async def count_likes_by_poll_from_db(poll_ids: list, until: datetime):
+    """Count like actions created before until, per poll: {poll_id: count}."""
+    return await get_repository().count_likes_by_poll(poll_ids, until)
+
+
+@traced
+async def count_votes_by_option_from_db(poll_ids: list, until: datetime):
+    """
+    Count vote actions created before until, per option of the given
+    polls: {option_id: count}.
+    """
+    return await get_repository().count_votes_by_option(poll_ids, until)
+
+
+@traced
+async def set_poll_likes_in_db(
+    poll_id: PyObjectId, expected: int, likes: int, until: datetime
+):
+    """
+    Overwrite a poll's like count, unless it changed since it was read
+    or was touched at or after until.
+    """
+    return await get_repository().set_poll_likes(poll_id, expected, likes, until)
+
+
+@traced
+async def set_poll_option_votes_in_db(
+    poll_id: str, option_id: PyObjectId, expected: int, votes: int, until: datetime
+):
+    """
+    Overwrite an option's vote count, unless it changed since it was read
+    or was touched at or after until.
+    """
+    return await get_repository().set_poll_option_votes(
+        poll_id, option_id, expected, votes, until
+    )
+
+
+# POLL CLOSING AND ARCHIVAL
+@traced
+async def close_poll_in_db(poll_id: PyObjectId, closed_at: datetime):
+    """Mark a poll closed, unless it already is (modified_count is then 0)."""
+    return await get_repository().close_poll(poll_id, closed_at)
+
+
+@traced
+async def get_polls_to_archive_from_db(cutoff: datetime, limit: int):
+    """
+    Get up to limit polls closed before cutoff whose actions are still in
+    the hot collections: [{_id, archived_at}].
+    """
+    return await get_repository().get_polls_to_archive(cutoff, limit)
+
+
+@traced
+async def claim_poll_archive_in_db(poll_id: PyObjectId, until: datetime):
+    """
+    Claim a poll for archival until the given time, unless another worker
+    holds a live claim on it (modified_count is then 0).
+    """
+    return await get_repository().claim_poll_archive(poll_id, until)
+
+
+# Stream the actions of a poll from one action collection, oldest first
+def iter_actions_for_poll_from_db(poll_id: str, collection: str):
+    """Yield every like or vote action of a poll without loading them all."""
+    return get_repository().iter_actions_for_poll(poll_id, collection)
+
+
+@traced
+async def save_action_archive_in_db(poll_id: str, chunk: dict):
+    """Upsert one compressed chunk of a poll's archived actions."""
+    return await get_repository().save_action_archive(poll_id, chunk)
+
+
+@traced
+async def delete_actions_for_poll_in_db(poll_id: str):
+    """Delete every like/vote action of a poll. Returns how many were deleted."""
+    return await get_repository().delete_actions_for_poll(poll_id)
+
+
+@traced
+async def set_poll_archive_state_in_db(poll_id: PyObjectId, state: dict):
+    """Set the archival timestamps (archived_at, purged_at) of a poll."""
+    return await get_repository().set_poll_archive_state(poll_id, state)
+
+
+# IDEMPOTENCY KEYS
+@traced
+async def claim_idempotency_key_in_db(key: str, expires_at: datetime):
+    """
+    Claim an Idempotency-Key until expires_at. Returns None if it was
+    free (or expired), else the live record: {_id, response?}.
+    """
+    return await get_repository().claim_idempotency_key(key, expires_at)
+
+
+@traced
+async def save_idempotent_response_in_db(
+    key: str, response: dict, expires_at: datetime
+):
+    """Store the response of a claimed Idempotency-Key until expires_at."""
+    return await get_repository().save_idempotent_response(key, response, expires_at)
+
+
+@traced
+async def release_idempotency_key_in_db(key: str):
+    """Drop a claimed Idempotency-Key so a retry runs the request again."""
+    return await get_repository().release_idempotency_key(key)
@@ -0,0 +1,86 @@
+# utils/idempotency.py
+import asyncio
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Optional
+
+from bson import Binary
+
+from settings import settings
+from utils.cache import TTLCache
+from utils.database import (
+    claim_idempotency_key_in_db,
+    save_idempotent_response_in_db,
+    release_idempotency_key_in_db,
+)
+
+# A claim left by a worker that died mid-request is taken over after this
+_PENDING_SECONDS = 60
+
+# Scoped key -> stored response, or the Future of a request still running
+_responses = TTLCache(settings.idempotency_cache_size, settings.idempotency_ttl_seconds)
+
+
+class IdempotencyConflict(Exception):
+    """Another request with the same key is still being handled."""
+
+
+def scoped_key(authorization: bytes, path: str, key: str) -> str:
+    """Keys only match for the same caller (token) and the same route."""
+    caller = blake2b(authorization, digest_size=12).hexdigest()
+    return f"{caller}:{path}:{key}"
+
+
+async def begin(key: str) -> Optional[dict]:
+    """
+    Return the stored response for key, waiting for a request with the
+    same key that is still running in this worker. Returns None once the
+    key is claimed for the caller, who must then finish() it.
+    """
+    entry = _responses.get(key)
+    if isinstance(entry, asyncio.Future):
+        # shield: a cancelled retry must not cancel the original request
+        return await asyncio.shield(entry)
+    if entry is not None:
+        return entry
+
+    if settings.idempotency_store == "database":
+        expires_at = datetime.utcnow() + timedelta(seconds=_PENDING_SECONDS)
+        record = await claim_idempotency_key_in_db(key, expires_at)
+        if record is not None:
+            if record.get("response") is None:
+                raise IdempotencyConflict(key)
+            response = dict(record["response"], body=bytes(record["response"]["body"]))
+            _responses.set(key, response)
+            return response
+
+    _responses.set(key, asyncio.get_running_loop().create_future())
+    return None
+
+
+async def finish(key: str, response: Optional[dict]):
+    """
+    Store the response of a claimed key (a dict of status, headers and
+    body), or release the key with None so a retry runs again.
+    """
+    pending = _responses.pop(key)
+    if response is not None:
+        _responses.set(key, response)
+    if isinstance(pending, asyncio.Future) and not pending.done():
+        if response is not None:
+            pending.set_result(response)
+        else:
+            pending.set_exception(IdempotencyConflict(key))
+            # Waiters re-raise it; nobody else may be listening
+            pending.exception()
+
+    if settings.idempotency_store == "database":
+        if response is not None:
+            expires_at = datetime.utcnow() + timedelta(
+                seconds=settings.idempotency_ttl_seconds
+            )
+            await save_idempotent_response_in_db(
+                key, dict(response, body=Binary(response["body"])), expires_at
+            )
+        else:
+            await release_idempotency_key_in_db(key)
@@ -0,0 +1,466 @@
+# utils/memory_repository.py
+import copy
+import math
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from utils.repository import Repository
+
+
+class _WriteResult:
+    """
+    Stands in for pymongo's InsertOneResult, UpdateResult, etc. with the
+    attributes callers read, so this backend never imports pymongo
+    (a good share of the API's startup time).
+    """
+
+    acknowledged = True
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def _insert(collection: dict, document: dict) -> _WriteResult:
+    # Like pymongo, give the caller's document its new _id
+    document.setdefault("_id", ObjectId())
+    collection[document["_id"]] = dict(document)
+    return _WriteResult(inserted_id=document["_id"])
+
+
+def _update_result(matched: bool, modified: bool = True) -> _WriteResult:
+    return _WriteResult(
+        matched_count=int(matched),
+        modified_count=int(matched and modified),
+        upserted_id=None,
+    )
+
+
+def _log_add(a: float, b: float) -> float:
+    # log(exp(a) + exp(b)) without overflowing
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _in_range(value: Optional[datetime], since: datetime, until: datetime) -> bool:
+    return value is not None and since <= value < until
+
+
+def _settled(document: dict, until: datetime) -> bool:
+    touched_at = document.get("touched_at")
+    return touched_at is None or touched_at < until
+
+
+class InMemoryRepository(Repository):
+    """
+    Repository that keeps every collection in process memory, for
+    benchmarking the layers above the database and for single-process
+    soak tests. Every lookup the routers make is served from an index
+    dict, and each method runs without awaiting, so it is atomic with
+    respect to other requests. Nothing survives a restart.
+    """
+
+    def __init__(self):
+        # Collections: _id -> document
+        self.users: Dict[ObjectId, dict] = {}
+        self.polls: Dict[ObjectId, dict] = {}
+        self.poll_options: Dict[ObjectId, dict] = {}
+        self.poll_like_actions: Dict[ObjectId, dict] = {}
+        self.poll_vote_actions: Dict[ObjectId, dict] = {}
+        self.poll_trending_scores: Dict[str, dict] = {}
+        self.maintenance: Dict[str, dict] = {}
+        self.poll_action_archives: Dict[str, dict] = {}
+        self.idempotency_keys: Dict[str, dict] = {}
+        # Indexes
+        self._user_by_email: Dict[str, ObjectId] = {}
+        self._options_by_poll: Dict[str, Set[ObjectId]] = defaultdict(set)
+        self._like_by_user_poll: Dict[Tuple[str, str], ObjectId] = {}
+        self._likes_by_poll: Dict[str, Set[ObjectId]] = defaultdict(set)
+        self._vote_by_user_poll: Dict[Tuple[str, str], ObjectId] = {}
+        self._votes_by_poll: Dict[str, Set[ObjectId]] = defaultdict(set)
+
+    # INDEXES
+    async def ensure_indexes(self):
+        return None
+
+    # USER
+    async def get_user_by_email(self, email: str):
+        user_id = self._user_by_email.get(email)
+        return dict(self.users[user_id]) if user_id is not None else None
+
+    async def create_user(self, user_data: dict):
+        if user_data["email_id"] in self._user_by_email:
+            return None
+        result = _insert(self.users, user_data)
+        self._user_by_email[user_data["email_id"]] = result.inserted_id
+        return result
+
+    # POLL
+    async def get_all_polls(self):
+        # Same cap as the Motor query, in insertion (natural) order
+        polls = []
+        for poll in self.polls.values():
+            if len(polls) == 100:
+                break
+            polls.append(dict(poll))
+        return polls
+
+    async def get_poll_by_id(self, poll_id, secondary_ok: bool = False):
+        poll = self.polls.get(poll_id)
+        return dict(poll) if poll is not None else None
+
+    async def get_polls_by_ids(self, poll_ids: list):
+        return [dict(self.polls[pid]) for pid in poll_ids if pid in self.polls]
+
+    async def get_poll_counts(self, poll_ids: list):
+        counts = []
+        for poll_id in poll_ids:
+            poll = self.polls.get(poll_id)
+            if poll is None:
+                continue
+            option_ids = sorted(self._options_by_poll.get(str(poll_id), ()))
+            options = [
+                {
+                    "_id": option_id,
+                    "votes": self.poll_options[option_id].get("votes", 0),
+                }
+                for option_id in option_ids
+            ]
+            counts.append(
+                {"_id": poll_id, "likes": poll.get("likes", 0), "options": options}
+            )
+        return counts
+
+    async def search_poll_ids(self, patterns: list, limit: int):
+        regexes = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        poll_ids = []
+        for poll_id in sorted(self.polls, reverse=True):
+            if len(poll_ids) == limit:
+                break
+            if all(regex.search(self.polls[poll_id]["text"]) for regex in regexes):
+                poll_ids.append(str(poll_id))
+        return poll_ids
+
+    async def iter_poll_texts(self):
+        for poll_id in sorted(self.polls):
+            poll = self.polls.get(poll_id)
+            if poll is not None:
+                yield {"_id": poll_id, "text": poll["text"]}
+
+    async def iter_poll_ids(self):
+        for poll_id in list(self.polls):
+            yield {"_id": poll_id}
+
+    async def create_poll(self, poll_data: dict):
+        return _insert(self.polls, poll_data)
+
+    async def delete_poll(self, poll_id):
+        for option_id in self._options_by_poll.pop(str(poll_id), ()):
+            self.poll_options.pop(option_id, None)
+        poll = self.polls.pop(poll_id, None)
+        return _WriteResult(deleted_count=int(poll is not None))
+
+    async def update_poll_likes(self, poll_id, increment: int):
+        poll = self.polls.get(poll_id)
+        if poll is not None:
+            poll["likes"] = poll.get("likes", 0) + increment
+            poll["touched_at"] = datetime.utcnow()
+        return _update_result(poll is not None)
+
+    # POLL LIKE ACTION
+    async def get_like_action(self, user_id: str, poll_id: str):
+        like_id = self._like_by_user_poll.get((user_id, poll_id))
+        return dict(self.poll_like_actions[like_id]) if like_id is not None else None
+
+    async def get_liked_poll_ids(self, user_id: str, poll_ids: list):
+        return [pid for pid in poll_ids if (user_id, pid) in self._like_by_user_poll]
+
+    async def iter_like_actions(self):
+        for like_action in list(self.poll_like_actions.values()):
+            yield {"poll_id": like_action["poll_id"], "user_id": like_action["user_id"]}
+
+    async def create_like_action(self, like_data: dict):
+        result = _insert(self.poll_like_actions, like_data)
+        key = (like_data["user_id"], like_data["poll_id"])
+        self._like_by_user_poll[key] = result.inserted_id
+        self._likes_by_poll[like_data["poll_id"]].add(result.inserted_id)
+        return result
+
+    async def delete_like_action(self, poll_id: str, like_id):
+        like_action = self.poll_like_actions.pop(like_id, None)
+        if like_action is not None:
+            key = (like_action["user_id"], like_action["poll_id"])
+            if self._like_by_user_poll.get(key) == like_id:
+                del self._like_by_user_poll[key]
+            self._likes_by_poll[like_action["poll_id"]].discard(like_id)
+        return _WriteResult(deleted_count=int(like_action is not None))
+
+    # POLL OPTION
+    async def create_poll_option(self, option_data: dict):
+        result = _insert(self.poll_options, option_data)
+        self._options_by_poll[option_data["poll_id"]].add(result.inserted_id)
+        return result
+
+    async def create_poll_options(self, poll_id: str, options_data: list):
+        inserted_ids = []
+        for option_data in options_data:
+            result = await self.create_poll_option(option_data)
+            inserted_ids.append(result.inserted_id)
+        return _WriteResult(inserted_ids=inserted_ids)
+
+    async def get_poll_option_by_id(self, poll_id: str, option_id):
+        option = self.poll_options.get(option_id)
+        return dict(option) if option is not None else None
+
+    async def update_poll_option_votes(self, poll_id: str, option_id, increment: int):
+        option = self.poll_options.get(option_id)
+        if option is not None:
+            option["votes"] = option.get("votes", 0) + increment
+            option["touched_at"] = datetime.utcnow()
+        return _update_result(option is not None)
+
+    async def get_options_for_poll(self, poll_id: str):
+        return await self.get_options_for_polls([poll_id])
+
+    async def get_options_for_polls(self, poll_ids: list):
+        options = []
+        for poll_id in poll_ids:
+            for option_id in sorted(self._options_by_poll.get(poll_id, ())):
+                options.append(dict(self.poll_options[option_id]))
+        return options
+
+    # POLL VOTE ACTION
+    async def get_vote_action_by_poll(self, user_id: str, poll_id: str):
+        vote_id = self._vote_by_user_poll.get((user_id, poll_id))
+        return dict(self.poll_vote_actions[vote_id]) if vote_id is not None else None
+
+    async def get_voted_options(self, user_id: str, poll_ids: list):
+        votes = {}
+        for poll_id in poll_ids:
+            vote_id = self._vote_by_user_poll.get((user_id, poll_id))
+            if vote_id is not None:
+                votes[poll_id] = self.poll_vote_actions[vote_id]["poll_option_id"]
+        return votes
+
+    async def iter_vote_actions(self):
+        for vote_action in list(self.poll_vote_actions.values()):
+            yield {"poll_id": vote_action["poll_id"], "user_id": vote_action["user_id"]}
+
+    async def create_vote_action(self, vote_data: dict):
+        result = _insert(self.poll_vote_actions, vote_data)
+        key = (vote_data["user_id"], vote_data["poll_id"])
+        self._vote_by_user_poll[key] = result.inserted_id
+        self._votes_by_poll[vote_data["poll_id"]].add(result.inserted_id)
+        return result
+
+    async def delete_vote_action(self, poll_id: str, vote_id):
+        vote_action = self.poll_vote_actions.pop(vote_id, None)
+        if vote_action is not None:
+            key = (vote_action["user_id"], vote_action["poll_id"])
+            if self._vote_by_user_poll.get(key) == vote_id:
+                del self._vote_by_user_poll[key]
+            self._votes_by_poll[vote_action["poll_id"]].discard(vote_id)
+        return _WriteResult(deleted_count=int(vote_action is not None))
+
+    # POLL TRENDING SCORES
+    async def get_trending_scores(self, limit: int):
+        scores = sorted(
+            self.poll_trending_scores.values(),
+            key=lambda score: score["log_score"],
+            reverse=True,
+        )
+        return [dict(score) for score in scores[:limit]]
+
+    async def delete_trending_scores_below(self, log_score: float):
+        pruned = [
+            poll_id
+            for poll_id, stored in self.poll_trending_scores.items()
+            if stored["log_score"] < log_score
+        ]
+        for poll_id in pruned:
+            del self.poll_trending_scores[poll_id]
+        return _WriteResult(deleted_count=len(pruned))
+
+    async def add_trending_scores(self, entries: list):
+        upserted = []
+        for index, (poll_id, log_score) in enumerate(entries):
+            stored = self.poll_trending_scores.get(poll_id)
+            if stored is None:
+                upserted.append({"index": index, "_id": poll_id})
+            else:
+                log_score = _log_add(stored["log_score"], log_score)
+            self.poll_trending_scores[poll_id] = {
+                "_id": poll_id,
+                "log_score": log_score,
+            }
+        return _WriteResult(
+            inserted_count=0,
+            upserted_count=len(upserted),
+            matched_count=len(entries) - len(upserted),
+            modified_count=len(entries) - len(upserted),
+            deleted_count=0,
+            upserted_ids={entry["index"]: entry["_id"] for entry in upserted},
+        )
+
+    # COUNTER RECONCILIATION
+    async def get_maintenance_state(self, job: str):
+        state = self.maintenance.get(job)
+        return copy.deepcopy(state) if state is not None else None
+
+    async def save_maintenance_state(self, job: str, state: dict):
+        matched = job in self.maintenance
+        stored = self.maintenance.setdefault(job, {"_id": job})
+        stored.update(copy.deepcopy(state))
+        return _update_result(matched)
+
+    async def get_touched_poll_ids(self, since: datetime, until: datetime):
+        poll_ids = {
+            str(poll_id)
+            for poll_id, poll in self.polls.items()
+            if _in_range(poll.get("touched_at"), since, until)
+        }
+        for option in self.poll_options.values():
+            if _in_range(option.get("touched_at"), since, until):
+                poll_ids.add(option["poll_id"])
+        for actions in (self.poll_like_actions, self.poll_vote_actions):
+            for action in actions.values():
+                if _in_range(action.get("created_at"), since, until):
+                    poll_ids.add(action["poll_id"])
+        return poll_ids
+
+    async def get_poll_ids_page(self, after_id, limit: int):
+        poll_ids = sorted(self.polls)
+        start = 0 if after_id is None else bisect_right(poll_ids, after_id)
+        return poll_ids[start : start + limit]
+
+    async def count_likes_by_poll(self, poll_ids: list, until: datetime):
+        counts = defaultdict(int)
+        for poll_id in poll_ids:
+            for like_id in self._likes_by_poll.get(poll_id, ()):
+                if self.poll_like_actions[like_id]["created_at"] < until:
+                    counts[poll_id] += 1
+        return dict(counts)
+
+    async def count_votes_by_option(self, poll_ids: list, until: datetime):
+        counts = defaultdict(int)
+        for poll_id in poll_ids:
+            for vote_id in self._votes_by_poll.get(poll_id, ()):
+                vote = self.poll_vote_actions[vote_id]
+                if vote["created_at"] < until:
+                    counts[vote["poll_option_id"]] += 1
+        return dict(counts)
+
+    async def set_poll_likes(self, poll_id, expected: int, likes: int, until: datetime):
+        poll = self.polls.get(poll_id)
+        matched = (
+            poll is not None and poll.get("likes") == expected and _settled(poll, until)
+        )
+        if matched:
+            poll["likes"] = likes
+        return _update_result(matched, modified=expected != likes)
+
+    async def set_poll_option_votes(
+        self, poll_id: str, option_id, expected: int, votes: int, until: datetime
+    ):
+        option = self.poll_options.get(option_id)
+        matched = (
+            option is not None
+            and option.get("votes") == expected
+            and _settled(option, until)
+        )
+        if matched:
+            option["votes"] = votes
+        return _update_result(matched, modified=expected != votes)
+
+    # POLL CLOSING AND ARCHIVAL
+    async def close_poll(self, poll_id, closed_at: datetime):
+        poll = self.polls.get(poll_id)
+        matched = poll is not None and poll.get("closed_at") is None
+        if matched:
+            poll["closed_at"] = closed_at
+        return _update_result(matched)
+
+    async def get_polls_to_archive(self, cutoff: datetime, limit: int):
+        polls = []
+        for poll_id, poll in self.polls.items():
+            if len(polls) == limit:
+                break
+            ended = [poll.get("closed_at"), poll.get("closes_at")]
+            ended = [when for when in ended if when is not None]
+            claimed = poll.get("archive_claimed_until")
+            if claimed is not None and claimed > datetime.utcnow():
+                continue
+            if poll.get("purged_at") is None and ended and min(ended) < cutoff:
+                polls.append({"_id": poll_id, "archived_at": poll.get("archived_at")})
+        return polls
+
+    async def claim_poll_archive(self, poll_id, until: datetime):
+        poll = self.polls.get(poll_id)
+        claimed = poll.get("archive_claimed_until") if poll is not None else None
+        matched = (
+            poll is not None
+            and poll.get("purged_at") is None
+            and (claimed is None or claimed <= datetime.utcnow())
+        )
+        if matched:
+            poll["archive_claimed_until"] = until
+        return _update_result(matched)
+
+    async def iter_actions_for_poll(self, poll_id: str, collection: str):
+        actions, action_ids = self._actions_of_poll(poll_id, collection)
+        for action_id in sorted(action_ids):
+            action = actions.get(action_id)
+            if action is not None:
+                yield dict(action)
+
+    def _actions_of_poll(self, poll_id: str, collection: str):
+        if collection == "poll_like_actions":
+            return self.poll_like_actions, self._likes_by_poll.get(poll_id, ())
+        return self.poll_vote_actions, self._votes_by_poll.get(poll_id, ())
+
+    async def save_action_archive(self, poll_id: str, chunk: dict):
+        matched = chunk["_id"] in self.poll_action_archives
+        self.poll_action_archives[chunk["_id"]] = dict(chunk)
+        return _update_result(matched)
+
+    async def delete_actions_for_poll(self, poll_id: str):
+        like_ids = list(self._likes_by_poll.get(poll_id, ()))
+        vote_ids = list(self._votes_by_poll.get(poll_id, ()))
+        for like_id in like_ids:
+            await self.delete_like_action(poll_id, like_id)
+        for vote_id in vote_ids:
+            await self.delete_vote_action(poll_id, vote_id)
+        return len(like_ids) + len(vote_ids)
+
+    async def set_poll_archive_state(self, poll_id, state: dict):
+        poll = self.polls.get(poll_id)
+        if poll is not None:
+            poll.update(state)
+        return _update_result(poll is not None)
+
+    # IDEMPOTENCY KEYS
+    async def claim_idempotency_key(self, key: str, expires_at: datetime):
+        record = self.idempotency_keys.get(key)
+        if record is not None and record["expires_at"] > datetime.utcnow():
+            return copy.deepcopy(record)
+        self.idempotency_keys[key] = {"_id": key, "expires_at": expires_at}
+        return None
+
+    async def save_idempotent_response(
+        self, key: str, response: dict, expires_at: datetime
+    ):
+        matched = key in self.idempotency_keys
+        self.idempotency_keys[key] = {
+            "_id": key,
+            "response": copy.deepcopy(response),
+            "expires_at": expires_at,
+        }
+        return _update_result(matched)
+
+    async def release_idempotency_key(self, key: str):
+        record = self.idempotency_keys.pop(key, None)
+        return _WriteResult(deleted_count=int(record is not None))
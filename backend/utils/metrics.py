@@ -0,0 +1,232 @@
+# utils/metrics.py
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by labels.
+
+    Metrics are updated from pymongo's listeners on Motor's executor
+    threads as well as from the event loop, so updates and rendering
+    hold the metric's lock.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self.values.items())
+        return [
+            f"{self.name}{_labels(self.label_names, labels)} {value}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self.values[labels] = value
+
+    def add(self, amount: float, *labels: str):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram:
+    """Bucketed distribution of observations, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.buckets = buckets
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        # See Counter
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 2)
+            series[bucket] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        # Copy each series, so a render never mixes counts from two moments
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self.values.items()]
+        lines = []
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[-2]
+            le = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {series[-1]}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Create a single registry for the app
+registry = Registry()
+
+# HTTP
+http_request_duration = registry.register(
+    Histogram(
+        "quickpoll_http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        labels=("method", "route"),
+    )
+)
+http_requests_total = registry.register(
+    Counter(
+        "quickpoll_http_requests_total",
+        "HTTP requests by route template and status code.",
+        labels=("method", "route", "status"),
+    )
+)
+
+http_requests_in_flight = registry.register(
+    Gauge(
+        "quickpoll_http_requests_in_flight",
+        "HTTP requests being handled by this worker.",
+    )
+)
+requests_rejected_total = registry.register(
+    Counter(
+        "quickpoll_requests_rejected_total",
+        "Requests turned away by admission control, by budget and reason.",
+        labels=("budget", "reason"),
+    )
+)
+
+# MongoDB
+mongo_command_duration = registry.register(
+    Histogram(
+        "quickpoll_mongo_command_duration_seconds",
+        "MongoDB command round-trip time by command name.",
+        labels=("command",),
+    )
+)
+mongo_command_failures_total = registry.register(
+    Counter(
+        "quickpoll_mongo_command_failures_total",
+        "Failed MongoDB commands by command name.",
+        labels=("command",),
+    )
+)
+mongo_pool_wait_duration = registry.register(
+    Histogram(
+        "quickpoll_mongo_pool_wait_seconds",
+        "Time spent waiting to check a connection out of the MongoDB pool.",
+    )
+)
+mongo_pool_checkout_failures_total = registry.register(
+    Counter(
+        "quickpoll_mongo_pool_checkout_failures_total",
+        "Failed MongoDB connection checkouts by reason.",
+        labels=("reason",),
+    )
+)
+mongo_pool_connections = registry.register(
+    Gauge(
+        "quickpoll_mongo_pool_connections",
+        "Open MongoDB connections by server address.",
+        labels=("address",),
+    )
+)
+
+# WebSockets
+websocket_connections = registry.register(
+    Gauge("quickpoll_websocket_connections", "Open WebSocket connections.")
+)
+websocket_broadcast_duration = registry.register(
+    Histogram(
+        "quickpoll_websocket_broadcast_duration_seconds",
+        "Time to fan one broadcast out to every open WebSocket.",
+    )
+)
+websocket_messages_sent_total = registry.register(
+    Counter(
+        "quickpoll_websocket_messages_sent_total",
+        "WebSocket messages sent to clients.",
+    )
+)
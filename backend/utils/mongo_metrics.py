@@ -0,0 +1,77 @@
+# utils/mongo_metrics.py
+from pymongo import monitoring
+
+from utils.metrics import (
+    mongo_command_duration,
+    mongo_command_failures_total,
+    mongo_pool_checkout_failures_total,
+    mongo_pool_connections,
+    mongo_pool_wait_duration,
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener that records per-command durations."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000, event.command_name
+        )
+
+    def failed(self, event):
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000, event.command_name
+        )
+        mongo_command_failures_total.inc(event.command_name)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """pymongo pool listener that records checkout waits and pool sizes."""
+
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _add_connections(self, event, amount: int):
+        mongo_pool_connections.add(amount, self._address(event))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add_connections(event, 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add_connections(event, -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        if event.duration is not None:
+            mongo_pool_wait_duration.observe(event.duration)
+        mongo_pool_checkout_failures_total.inc(event.reason)
+
+    def connection_checked_out(self, event):
+        # duration covers the whole checkout, including any wait for a
+        # free connection when the pool is at maxPoolSize
+        if event.duration is not None:
+            mongo_pool_wait_duration.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        pass
@@ -0,0 +1,486 @@
+# utils/motor_repository.py
+import asyncio
+import heapq
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from dbconn import get_database, get_shard_databases
+from utils.repository import ACTION_COLLECTIONS, Repository
+from utils.sharding import group_by_shard, shard_for
+
+
+def _shard(poll_id, secondary_ok: bool = False):
+    """The shard database that stores a poll and its options and actions."""
+    shards = get_shard_databases(secondary_ok)
+    return shards[shard_for(poll_id, len(shards))]
+
+
+async def _per_shard(poll_ids: list, query) -> list:
+    """
+    Run query(shard_db, poll_ids_on_that_shard) concurrently on every
+    shard holding one of poll_ids. Returns the list of results.
+    """
+    shards = get_shard_databases()
+    groups = group_by_shard(poll_ids, len(shards))
+    return await asyncio.gather(
+        *(query(shards[index], ids) for index, ids in groups.items())
+    )
+
+
+def _log_add(field: str, log_value: float) -> list:
+    """
+    Update pipeline setting field to log(exp(field) + exp(log_value)),
+    computed as max + log(1 + exp(min - max)) so it never overflows. A
+    missing field counts as log(0).
+    """
+    old = {"$ifNull": [f"${field}", -1e300]}
+    high = {"$max": [old, log_value]}
+    low = {"$min": [old, log_value]}
+    spread = {"$exp": {"$subtract": [low, high]}}
+    return [{"$set": {field: {"$add": [high, {"$ln": {"$add": [1, spread]}}]}}}]
+
+
+async def _merge_by_id(cursors):
+    """Merge cursors that are each sorted by _id into one sorted stream."""
+    streams = [cursor.__aiter__() for cursor in cursors]
+    heads = []
+    for index, stream in enumerate(streams):
+        doc = await anext(stream, None)
+        if doc is not None:
+            heads.append((doc["_id"], index, doc))
+    heapq.heapify(heads)
+    while heads:
+        _, index, doc = heapq.heappop(heads)
+        yield doc
+        doc = await anext(streams[index], None)
+        if doc is not None:
+            heapq.heappush(heads, (doc["_id"], index, doc))
+
+
+class MotorRepository(Repository):
+    """
+    Repository backed by MongoDB through the shared Motor clients. Polls
+    and their options and like/vote actions live on the shard picked by
+    hash of the poll id (see MONGO_SHARD_URIS); users, trending scores
+    and maintenance state live in the main database.
+    """
+
+    # INDEXES
+    async def ensure_indexes(self):
+        # Expired idempotency keys are removed by MongoDB's TTL monitor
+        await get_database()["idempotency_keys"].create_index(
+            "expires_at", expireAfterSeconds=0
+        )
+        # Two concurrent registrations must not create the same user twice
+        await get_database()["users"].create_index("email_id", unique=True)
+        # Trending reloads read the top scores; pruning deletes the bottom ones
+        await get_database()["poll_trending_scores"].create_index("log_score")
+        for db in get_shard_databases():
+            await db["poll_like_actions"].create_index([("user_id", 1), ("poll_id", 1)])
+            await db["poll_vote_actions"].create_index([("user_id", 1), ("poll_id", 1)])
+            await db["poll_options"].create_index("poll_id")
+            # Used by the counter reconciler to find recently changed polls
+            await db["polls"].create_index("touched_at", sparse=True)
+            await db["poll_options"].create_index("touched_at", sparse=True)
+            await db["poll_like_actions"].create_index("created_at")
+            await db["poll_vote_actions"].create_index("created_at")
+            # Used by the archiver to find polls closed long ago
+            await db["polls"].create_index("closed_at", sparse=True)
+            await db["polls"].create_index("closes_at", sparse=True)
+            await db["poll_action_archives"].create_index("poll_id")
+
+    # USER
+    async def get_user_by_email(self, email: str):
+        db = get_database()
+        return await db["users"].find_one({"email_id": email})
+
+    async def create_user(self, user_data: dict):
+        db = get_database()
+        try:
+            return await db["users"].insert_one(user_data)
+        except DuplicateKeyError:
+            return None
+
+    # POLL
+    async def get_all_polls(self):
+        # The poll list tolerates bounded staleness
+        shards = get_shard_databases(secondary_ok=True)
+        if len(shards) == 1:
+            return await shards[0]["polls"].find().to_list(100)
+        # Oldest 100 across shards, close to a single database's natural order
+        pages = await asyncio.gather(
+            *(db["polls"].find().sort("_id", 1).to_list(100) for db in shards)
+        )
+        polls = (poll for page in pages for poll in page)
+        return heapq.nsmallest(100, polls, key=lambda poll: poll["_id"])
+
+    async def get_poll_by_id(self, poll_id, secondary_ok: bool = False):
+        db = _shard(poll_id, secondary_ok)
+        return await db["polls"].find_one({"_id": poll_id})
+
+    async def get_polls_by_ids(self, poll_ids: list):
+        async def query(db, ids):
+            return await db["polls"].find({"_id": {"$in": ids}}).to_list(None)
+
+        pages = await _per_shard(poll_ids, query)
+        return [poll for page in pages for poll in page]
+
+    async def get_poll_counts(self, poll_ids: list):
+        async def query(db, ids):
+            # Both projections leave out the text and timestamps
+            return await asyncio.gather(
+                db["polls"].find({"_id": {"$in": ids}}, {"likes": 1}).to_list(None),
+                db["poll_options"]
+                .find(
+                    {"poll_id": {"$in": [str(poll_id) for poll_id in ids]}},
+                    {"poll_id": 1, "votes": 1},
+                )
+                .sort("_id", 1)
+                .to_list(None),
+            )
+
+        polls = {}
+        for shard_polls, shard_options in await _per_shard(poll_ids, query):
+            for poll in shard_polls:
+                poll["options"] = []
+                polls[str(poll["_id"])] = poll
+            for option in shard_options:
+                poll = polls.get(option.pop("poll_id"))
+                if poll is not None:
+                    poll["options"].append(option)
+        return list(polls.values())
+
+    async def search_poll_ids(self, patterns: list, limit: int):
+        query = {
+            "$and": [
+                {"text": {"$regex": pattern, "$options": "i"}} for pattern in patterns
+            ]
+        }
+        pages = await asyncio.gather(
+            *(
+                db["polls"].find(query, {"_id": 1}).sort("_id", -1).to_list(limit)
+                for db in get_shard_databases()
+            )
+        )
+        polls = (poll["_id"] for page in pages for poll in page)
+        return [str(poll_id) for poll_id in heapq.nlargest(limit, polls)]
+
+    async def iter_poll_texts(self):
+        cursors = [
+            db["polls"].find({}, {"text": 1}).sort("_id", 1)
+            for db in get_shard_databases()
+        ]
+        async for poll in _merge_by_id(cursors):
+            yield poll
+
+    async def iter_poll_ids(self):
+        for db in get_shard_databases():
+            async for poll in db["polls"].find({}, {"_id": 1}):
+                yield poll
+
+    async def create_poll(self, poll_data: dict):
+        # The id has to be known up front to pick the shard
+        poll_data.setdefault("_id", ObjectId())
+        return await _shard(poll_data["_id"])["polls"].insert_one(poll_data)
+
+    async def delete_poll(self, poll_id):
+        db = _shard(poll_id)
+        await db["poll_options"].delete_many({"poll_id": str(poll_id)})
+        return await db["polls"].delete_one({"_id": poll_id})
+
+    async def update_poll_likes(self, poll_id, increment: int):
+        return await _shard(poll_id)["polls"].update_one(
+            {"_id": poll_id},
+            {"$inc": {"likes": increment}, "$set": {"touched_at": datetime.utcnow()}},
+        )
+
+    # POLL LIKE ACTION
+    async def get_like_action(self, user_id: str, poll_id: str):
+        return await _shard(poll_id)["poll_like_actions"].find_one(
+            {"user_id": user_id, "poll_id": poll_id}
+        )
+
+    async def get_liked_poll_ids(self, user_id: str, poll_ids: list):
+        async def query(db, ids):
+            return (
+                await db["poll_like_actions"]
+                .find(
+                    {"user_id": user_id, "poll_id": {"$in": ids}},
+                    {"_id": 0, "poll_id": 1},
+                )
+                .to_list(None)
+            )
+
+        pages = await _per_shard(poll_ids, query)
+        return [like_action["poll_id"] for page in pages for like_action in page]
+
+    async def iter_like_actions(self):
+        projection = {"_id": 0, "poll_id": 1, "user_id": 1}
+        for db in get_shard_databases():
+            async for like_action in db["poll_like_actions"].find({}, projection):
+                yield like_action
+
+    async def create_like_action(self, like_data: dict):
+        db = _shard(like_data["poll_id"])
+        return await db["poll_like_actions"].insert_one(like_data)
+
+    async def delete_like_action(self, poll_id: str, like_id):
+        db = _shard(poll_id)
+        return await db["poll_like_actions"].delete_one({"_id": like_id})
+
+    # POLL OPTION
+    async def create_poll_option(self, option_data: dict):
+        db = _shard(option_data["poll_id"])
+        return await db["poll_options"].insert_one(option_data)
+
+    async def create_poll_options(self, poll_id: str, options_data: list):
+        return await _shard(poll_id)["poll_options"].insert_many(options_data)
+
+    async def get_poll_option_by_id(self, poll_id: str, option_id):
+        return await _shard(poll_id)["poll_options"].find_one({"_id": option_id})
+
+    async def update_poll_option_votes(self, poll_id: str, option_id, increment: int):
+        return await _shard(poll_id)["poll_options"].update_one(
+            {"_id": option_id},
+            {"$inc": {"votes": increment}, "$set": {"touched_at": datetime.utcnow()}},
+        )
+
+    async def get_options_for_poll(self, poll_id: str):
+        db = _shard(poll_id)
+        return await db["poll_options"].find({"poll_id": poll_id}).to_list(None)
+
+    async def get_options_for_polls(self, poll_ids: list):
+        async def query(db, ids):
+            options = db["poll_options"].find({"poll_id": {"$in": ids}})
+            return await options.to_list(None)
+
+        pages = await _per_shard(poll_ids, query)
+        return [option for page in pages for option in page]
+
+    # POLL VOTE ACTION
+    async def get_vote_action_by_poll(self, user_id: str, poll_id: str):
+        return await _shard(poll_id)["poll_vote_actions"].find_one(
+            {"user_id": user_id, "poll_id": poll_id}
+        )
+
+    async def get_voted_options(self, user_id: str, poll_ids: list):
+        async def query(db, ids):
+            return (
+                await db["poll_vote_actions"]
+                .find(
+                    {"user_id": user_id, "poll_id": {"$in": ids}},
+                    {"_id": 0, "poll_id": 1, "poll_option_id": 1},
+                )
+                .to_list(None)
+            )
+
+        pages = await _per_shard(poll_ids, query)
+        return {
+            vote_action["poll_id"]: vote_action["poll_option_id"]
+            for page in pages
+            for vote_action in page
+        }
+
+    async def iter_vote_actions(self):
+        projection = {"_id": 0, "poll_id": 1, "user_id": 1}
+        for db in get_shard_databases():
+            async for vote_action in db["poll_vote_actions"].find({}, projection):
+                yield vote_action
+
+    async def create_vote_action(self, vote_data: dict):
+        db = _shard(vote_data["poll_id"])
+        return await db["poll_vote_actions"].insert_one(vote_data)
+
+    async def delete_vote_action(self, poll_id: str, vote_id):
+        db = _shard(poll_id)
+        return await db["poll_vote_actions"].delete_one({"_id": vote_id})
+
+    # POLL TRENDING SCORES
+    async def get_trending_scores(self, limit: int):
+        db = get_database()
+        trending_collection = db["poll_trending_scores"]
+        return await trending_collection.find().sort("log_score", -1).to_list(limit)
+
+    async def add_trending_scores(self, entries: list):
+        db = get_database()
+        return await db["poll_trending_scores"].bulk_write(
+            [
+                UpdateOne(
+                    {"_id": poll_id}, _log_add("log_score", log_score), upsert=True
+                )
+                for poll_id, log_score in entries
+            ],
+            ordered=False,
+        )
+
+    async def delete_trending_scores_below(self, log_score: float):
+        db = get_database()
+        return await db["poll_trending_scores"].delete_many(
+            {"log_score": {"$lt": log_score}}
+        )
+
+    # COUNTER RECONCILIATION
+    async def get_maintenance_state(self, job: str):
+        db = get_database()
+        return await db["maintenance"].find_one({"_id": job})
+
+    async def save_maintenance_state(self, job: str, state: dict):
+        db = get_database()
+        return await db["maintenance"].update_one(
+            {"_id": job}, {"$set": state}, upsert=True
+        )
+
+    async def get_touched_poll_ids(self, since: datetime, until: datetime):
+        touched = {"touched_at": {"$gte": since, "$lt": until}}
+        created = {"created_at": {"$gte": since, "$lt": until}}
+        poll_ids = set()
+        for db in get_shard_databases():
+            async for poll in db["polls"].find(touched, {"_id": 1}):
+                poll_ids.add(str(poll["_id"]))
+            poll_ids.update(await db["poll_options"].distinct("poll_id", touched))
+            poll_ids.update(await db["poll_like_actions"].distinct("poll_id", created))
+            poll_ids.update(await db["poll_vote_actions"].distinct("poll_id", created))
+        return poll_ids
+
+    async def get_poll_ids_page(self, after_id, limit: int):
+        query = {} if after_id is None else {"_id": {"$gt": after_id}}
+        pages = await asyncio.gather(
+            *(
+                db["polls"].find(query, {"_id": 1}).sort("_id", 1).to_list(limit)
+                for db in get_shard_databases()
+            )
+        )
+        return heapq.nsmallest(limit, (poll["_id"] for page in pages for poll in page))
+
+    async def count_likes_by_poll(self, poll_ids: list, until: datetime):
+        async def query(db, ids):
+            pipeline = [
+                {"$match": {"poll_id": {"$in": ids}, "created_at": {"$lt": until}}},
+                {"$group": {"_id": "$poll_id", "count": {"$sum": 1}}},
+            ]
+            return await db["poll_like_actions"].aggregate(pipeline).to_list(None)
+
+        pages = await _per_shard(poll_ids, query)
+        return {count["_id"]: count["count"] for page in pages for count in page}
+
+    async def count_votes_by_option(self, poll_ids: list, until: datetime):
+        async def query(db, ids):
+            pipeline = [
+                {"$match": {"poll_id": {"$in": ids}, "created_at": {"$lt": until}}},
+                {"$group": {"_id": "$poll_option_id", "count": {"$sum": 1}}},
+            ]
+            return await db["poll_vote_actions"].aggregate(pipeline).to_list(None)
+
+        pages = await _per_shard(poll_ids, query)
+        return {count["_id"]: count["count"] for page in pages for count in page}
+
+    async def set_poll_likes(self, poll_id, expected: int, likes: int, until: datetime):
+        return await _shard(poll_id)["polls"].update_one(
+            {
+                "_id": poll_id,
+                "likes": expected,
+                # Also matches documents never touched (no touched_at)
+                "touched_at": {"$not": {"$gte": until}},
+            },
+            {"$set": {"likes": likes}},
+        )
+
+    async def set_poll_option_votes(
+        self, poll_id: str, option_id, expected: int, votes: int, until: datetime
+    ):
+        return await _shard(poll_id)["poll_options"].update_one(
+            {
+                "_id": option_id,
+                "votes": expected,
+                "touched_at": {"$not": {"$gte": until}},
+            },
+            {"$set": {"votes": votes}},
+        )
+
+    # POLL CLOSING AND ARCHIVAL
+    async def close_poll(self, poll_id, closed_at: datetime):
+        return await _shard(poll_id)["polls"].update_one(
+            {"_id": poll_id, "closed_at": None}, {"$set": {"closed_at": closed_at}}
+        )
+
+    async def get_polls_to_archive(self, cutoff: datetime, limit: int):
+        query = {
+            "purged_at": None,
+            "$or": [{"closed_at": {"$lt": cutoff}}, {"closes_at": {"$lt": cutoff}}],
+            # Polls another worker is archiving right now are left to it
+            "archive_claimed_until": {"$not": {"$gt": datetime.utcnow()}},
+        }
+        projection = {"_id": 1, "archived_at": 1}
+        pages = await asyncio.gather(
+            *(
+                db["polls"].find(query, projection).to_list(limit)
+                for db in get_shard_databases()
+            )
+        )
+        return [poll for page in pages for poll in page][:limit]
+
+    async def claim_poll_archive(self, poll_id, until: datetime):
+        return await _shard(poll_id)["polls"].update_one(
+            {
+                "_id": poll_id,
+                "purged_at": None,
+                "archive_claimed_until": {"$not": {"$gt": datetime.utcnow()}},
+            },
+            {"$set": {"archive_claimed_until": until}},
+        )
+
+    async def iter_actions_for_poll(self, poll_id: str, collection: str):
+        cursor = _shard(poll_id)[collection].find({"poll_id": poll_id}).sort("_id", 1)
+        async for action in cursor:
+            yield action
+
+    async def save_action_archive(self, poll_id: str, chunk: dict):
+        return await _shard(poll_id)["poll_action_archives"].replace_one(
+            {"_id": chunk["_id"]}, chunk, upsert=True
+        )
+
+    async def delete_actions_for_poll(self, poll_id: str):
+        db = _shard(poll_id)
+        deleted = 0
+        for name in ACTION_COLLECTIONS:
+            result = await db[name].delete_many({"poll_id": poll_id})
+            deleted += result.deleted_count
+        return deleted
+
+    async def set_poll_archive_state(self, poll_id, state: dict):
+        return await _shard(poll_id)["polls"].update_one(
+            {"_id": poll_id}, {"$set": state}
+        )
+
+    # IDEMPOTENCY KEYS
+    async def claim_idempotency_key(self, key: str, expires_at: datetime):
+        keys = get_database()["idempotency_keys"]
+        try:
+            await keys.insert_one({"_id": key, "expires_at": expires_at})
+            return None
+        except DuplicateKeyError:
+            pass
+        # The TTL monitor runs once a minute, so take over expired records
+        result = await keys.update_one(
+            {"_id": key, "expires_at": {"$lte": datetime.utcnow()}},
+            {"$set": {"expires_at": expires_at}, "$unset": {"response": ""}},
+        )
+        if result.modified_count:
+            return None
+        # Deleted in between: report it as still running rather than race
+        return await keys.find_one({"_id": key}) or {"_id": key}
+
+    async def save_idempotent_response(
+        self, key: str, response: dict, expires_at: datetime
+    ):
+        return await get_database()["idempotency_keys"].update_one(
+            {"_id": key},
+            {"$set": {"response": response, "expires_at": expires_at}},
+            upsert=True,
+        )
+
+    async def release_idempotency_key(self, key: str):
+        return await get_database()["idempotency_keys"].delete_one({"_id": key})
@@ -0,0 +1,26 @@
+# utils/polls.py
+from datetime import datetime
+from typing import Optional
+
+from settings import settings
+from utils.cache import TTLCache
+
+# Closed poll id (str) -> poll document with its options. A closed poll
+# never changes again, so these are served as-is and must not be mutated.
+closed_poll_snapshots = TTLCache(
+    settings.closed_poll_cache_size, settings.closed_poll_cache_ttl_seconds
+)
+
+
+def is_poll_closed(poll: dict, now: Optional[datetime] = None) -> bool:
+    """A poll is closed once its creator closed it or its deadline passed."""
+    if poll.get("closed_at") is not None:
+        return True
+    closes_at = poll.get("closes_at")
+    return closes_at is not None and closes_at <= (now or datetime.utcnow())
+
+
+def remember_if_closed(poll: dict):
+    """Keep a loaded poll (with options) as a snapshot if it is closed."""
+    if is_poll_closed(poll):
+        closed_poll_snapshots.set(str(poll["_id"]), poll)
@@ -0,0 +1,96 @@
+# utils/ratelimit.py
+import math
+from collections import OrderedDict
+from time import monotonic
+
+from fastapi import HTTPException, status
+
+from settings import settings
+from utils.metrics import requests_rejected_total
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+
+class TokenBuckets:
+    """
+    One token bucket per key (a user id or an IP). Each take() is O(1),
+    and once the table is full the least recently used bucket object is
+    reused for a new key, so the steady state allocates nothing.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        """Spend a token. Returns 0 if there was one, else seconds until one."""
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self.max_keys:
+                # An idle bucket would have refilled anyway, so reuse it
+                _, bucket = buckets.popitem(last=False)
+            else:
+                bucket = _Bucket()
+            bucket.tokens = self.burst
+            buckets[key] = bucket
+        else:
+            buckets.move_to_end(key)
+            bucket.tokens = min(
+                self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+            )
+        bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RouteBudget:
+    """Per-user and per-IP token buckets for one group of routes."""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.by_user = TokenBuckets(rate, burst, settings.rate_limit_max_keys)
+        self.by_ip = TokenBuckets(
+            rate * settings.rate_limit_ip_multiplier,
+            burst * settings.rate_limit_ip_multiplier,
+            settings.rate_limit_max_keys,
+        )
+
+    def admit(self, user_id: str, ip: str):
+        """Raise 429 (with Retry-After) if the user or the IP is over budget."""
+        if not settings.rate_limit_enabled:
+            return
+        now = monotonic()
+        wait = self.by_ip.take(ip, now)
+        reason = "ip"
+        if not wait:
+            wait = self.by_user.take(user_id, now)
+            reason = "user"
+        if wait:
+            requests_rejected_total.inc(self.name, reason)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+
+# Budgets of the write routes
+vote_budget = RouteBudget(
+    "vote", settings.rate_limit_vote_per_second, settings.rate_limit_vote_burst
+)
+like_budget = RouteBudget(
+    "like", settings.rate_limit_like_per_second, settings.rate_limit_like_burst
+)
+create_budget = RouteBudget(
+    "create", settings.rate_limit_create_per_second, settings.rate_limit_create_burst
+)
@@ -0,0 +1,193 @@
+# utils/reconcile.py
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from models.mongo_models import PyObjectId
+from settings import settings
+from utils.database import (
+    get_maintenance_state_from_db,
+    save_maintenance_state_in_db,
+    get_touched_poll_ids_from_db,
+    get_poll_ids_page_from_db,
+    get_polls_by_ids_from_db,
+    get_options_for_polls_from_db,
+    count_likes_by_poll_from_db,
+    count_votes_by_option_from_db,
+    set_poll_likes_in_db,
+    set_poll_option_votes_in_db,
+)
+
+# Name of the job's state document in the maintenance collection
+JOB_NAME = "counter_reconciler"
+
+# At most this many corrections are stored with the last report
+_MAX_STORED_CORRECTIONS = 100
+
+# An incremental run walks its window in slices of this length
+_WINDOW_SLICE = timedelta(hours=1)
+
+
+async def reconcile_batch(poll_ids: List[str]) -> List[dict]:
+    """
+    Recompute likes and votes for a batch of polls from their action
+    documents and fix any counter that drifted. Returns the corrections.
+
+    A toggle writes its action and $incs the counter as two writes, so
+    a recount that lands between them would be undone by the late $inc
+    and leave the counter off by one. Only toggles older than
+    RECONCILE_SETTLE_SECONDS are taken as settled. Actions created since
+    then are not counted. A fix only applies if the counter still holds
+    the value that was read and was not touched since then. Toggles
+    remove their action only after the $inc, so a removal in flight has
+    already touched the counter. Skipped counters are picked up again
+    by the next run, because the $inc touches them.
+    """
+    until = datetime.utcnow() - timedelta(seconds=settings.reconcile_settle_seconds)
+    valid_ids = [PyObjectId(poll_id) for poll_id in poll_ids]
+    polls = await get_polls_by_ids_from_db(valid_ids)
+    # Archived polls keep their final counts while their actions are
+    # (being) moved out, so recounting them would zero them
+    polls = [poll for poll in polls if poll.get("archived_at") is None]
+    poll_ids = [str(poll["_id"]) for poll in polls]
+    options = await get_options_for_polls_from_db(poll_ids)
+    like_counts = await count_likes_by_poll_from_db(poll_ids, until)
+    vote_counts = await count_votes_by_option_from_db(poll_ids, until)
+
+    corrections = []
+    for poll in polls:
+        poll_id = str(poll["_id"])
+        stored = poll.get("likes", 0)
+        actual = like_counts.get(poll_id, 0)
+        if stored != actual:
+            result = await set_poll_likes_in_db(poll["_id"], stored, actual, until)
+            if result.modified_count:
+                corrections.append(
+                    {"poll_id": poll_id, "field": "likes", "from": stored, "to": actual}
+                )
+    for option in options:
+        option_id = str(option["_id"])
+        stored = option.get("votes", 0)
+        actual = vote_counts.get(option_id, 0)
+        if stored != actual:
+            result = await set_poll_option_votes_in_db(
+                option["poll_id"], option["_id"], stored, actual, until
+            )
+            if result.modified_count:
+                corrections.append(
+                    {
+                        "poll_id": option["poll_id"],
+                        "option_id": option_id,
+                        "field": "votes",
+                        "from": stored,
+                        "to": actual,
+                    }
+                )
+    return corrections
+
+
+async def _reconcile_in_batches(poll_ids: List[str]) -> List[dict]:
+    corrections = []
+    for start in range(0, len(poll_ids), settings.reconcile_batch_size):
+        batch = poll_ids[start : start + settings.reconcile_batch_size]
+        corrections.extend(await reconcile_batch(batch))
+        # Rate limit so a big run never competes with foreground requests
+        await asyncio.sleep(settings.reconcile_batch_pause_seconds)
+    return corrections
+
+
+async def _save_report(report: dict, state: dict):
+    corrections = report["corrections"]
+    print(
+        f"🧮 Counter reconciliation ({report['mode']}): checked "
+        f"{report['polls_checked']} polls, fixed {len(corrections)} counters."
+    )
+    state["last_report"] = {
+        **report,
+        "corrections": corrections[:_MAX_STORED_CORRECTIONS],
+        "corrections_total": len(corrections),
+    }
+    await save_maintenance_state_in_db(JOB_NAME, state)
+
+
+async def reconcile_touched_polls() -> dict:
+    """
+    Reconcile polls touched since the stored watermark, then advance it.
+
+    The watermark starts at most RECONCILE_MAX_LOOKBACK_HOURS back, so a
+    first run never scans every action ever written. The window is walked
+    one slice at a time, storing the watermark after each, so a backlog
+    is never one big query and a restarted worker resumes where it stopped.
+    """
+    state = await get_maintenance_state_from_db(JOB_NAME) or {}
+    until = datetime.utcnow() - timedelta(seconds=settings.reconcile_settle_seconds)
+    oldest = until - timedelta(hours=settings.reconcile_max_lookback_hours)
+    since = max(state.get("watermark", oldest), oldest)
+
+    polls_checked = 0
+    corrections = []
+    while since < until:
+        slice_end = min(since + _WINDOW_SLICE, until)
+        poll_ids = sorted(await get_touched_poll_ids_from_db(since, slice_end))
+        polls_checked += len(poll_ids)
+        corrections.extend(await _reconcile_in_batches(poll_ids))
+        since = slice_end
+        if since < until:
+            await save_maintenance_state_in_db(JOB_NAME, {"watermark": since})
+
+    report = {
+        "mode": "incremental",
+        "started_at": until,
+        "polls_checked": polls_checked,
+        "corrections": corrections,
+    }
+    await _save_report(report, {"watermark": until})
+    return report
+
+
+async def reconcile_all_polls() -> dict:
+    """
+    Reconcile every poll, paging through them by _id in bounded batches.
+    Drift the watermark cannot see (e.g. a crash between a toggle's two
+    writes, once its touched_at has aged out of the window) is repaired here.
+    """
+    started_at = datetime.utcnow()
+    polls_checked = 0
+    corrections = []
+    after_id = None
+    while True:
+        page = await get_poll_ids_page_from_db(after_id, settings.reconcile_batch_size)
+        if not page:
+            break
+        after_id = page[-1]
+        polls_checked += len(page)
+        corrections.extend(await reconcile_batch([str(pid) for pid in page]))
+        await asyncio.sleep(settings.reconcile_batch_pause_seconds)
+
+    report = {
+        "mode": "full",
+        "started_at": started_at,
+        "polls_checked": polls_checked,
+        "corrections": corrections,
+    }
+    await _save_report(report, {"last_full_run": started_at})
+    return report
+
+
+async def run_counter_reconciler():
+    """Background task: incremental runs, plus a periodic full recount."""
+    while True:
+        await asyncio.sleep(settings.reconcile_interval_seconds)
+        try:
+            await reconcile_touched_polls()
+            if settings.reconcile_full_every_hours > 0:
+                state = await get_maintenance_state_from_db(JOB_NAME) or {}
+                last_full_run = state.get("last_full_run", datetime.min)
+                due = last_full_run + timedelta(
+                    hours=settings.reconcile_full_every_hours
+                )
+                if datetime.utcnow() >= due:
+                    await reconcile_all_polls()
+        except Exception as e:
+            # Try again next interval rather than killing the task
+            print(f"❌ Counter reconciliation failed: {e}")
@@ -0,0 +1,215 @@
+# utils/repository.py
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+# Per-poll action collections, moved to cold storage once a poll is archived
+ACTION_COLLECTIONS = ("poll_like_actions", "poll_vote_actions")
+
+
+class Repository(ABC):
+    """
+    Storage behind the helpers in utils/database.py.
+
+    Every method that touches a poll's own data (the poll, its options
+    and its like/vote actions) is given the poll id, so an implementation
+    can partition that data by poll.
+
+    Documents go in and come out as plain dicts shaped like the Mongo
+    documents, and writes return pymongo result objects, or objects with
+    the same attributes (inserted_id, modified_count, deleted_count), so
+    callers never see which backend is in use.
+    """
+
+    # INDEXES
+    @abstractmethod
+    async def ensure_indexes(self): ...
+
+    # USER
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> Optional[dict]: ...
+
+    # Returns None if a user with that email_id already exists
+    @abstractmethod
+    async def create_user(self, user_data: dict): ...
+
+    # POLL
+    @abstractmethod
+    async def get_all_polls(self) -> List[dict]: ...
+
+    @abstractmethod
+    async def get_poll_by_id(
+        self, poll_id, secondary_ok: bool = False
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_polls_by_ids(self, poll_ids: list) -> List[dict]: ...
+
+    @abstractmethod
+    async def get_poll_counts(self, poll_ids: list) -> List[dict]: ...
+
+    @abstractmethod
+    async def search_poll_ids(self, patterns: list, limit: int) -> List[str]: ...
+
+    @abstractmethod
+    def iter_poll_texts(self) -> AsyncIterator[dict]: ...
+
+    @abstractmethod
+    def iter_poll_ids(self) -> AsyncIterator[dict]: ...
+
+    @abstractmethod
+    async def create_poll(self, poll_data: dict): ...
+
+    # Removes a poll and its options (undoes a create_poll that failed halfway)
+    @abstractmethod
+    async def delete_poll(self, poll_id): ...
+
+    @abstractmethod
+    async def update_poll_likes(self, poll_id, increment: int): ...
+
+    # POLL LIKE ACTION
+    @abstractmethod
+    async def get_like_action(self, user_id: str, poll_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_liked_poll_ids(self, user_id: str, poll_ids: list) -> List[str]: ...
+
+    @abstractmethod
+    def iter_like_actions(self) -> AsyncIterator[dict]: ...
+
+    @abstractmethod
+    async def create_like_action(self, like_data: dict): ...
+
+    @abstractmethod
+    async def delete_like_action(self, poll_id: str, like_id): ...
+
+    # POLL OPTION
+    @abstractmethod
+    async def create_poll_option(self, option_data: dict): ...
+
+    @abstractmethod
+    async def create_poll_options(self, poll_id: str, options_data: list): ...
+
+    @abstractmethod
+    async def get_poll_option_by_id(
+        self, poll_id: str, option_id
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def update_poll_option_votes(
+        self, poll_id: str, option_id, increment: int
+    ): ...
+
+    @abstractmethod
+    async def get_options_for_poll(self, poll_id: str) -> List[dict]: ...
+
+    @abstractmethod
+    async def get_options_for_polls(self, poll_ids: list) -> List[dict]: ...
+
+    # POLL VOTE ACTION
+    @abstractmethod
+    async def get_vote_action_by_poll(
+        self, user_id: str, poll_id: str
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_voted_options(
+        self, user_id: str, poll_ids: list
+    ) -> Dict[str, str]: ...
+
+    @abstractmethod
+    def iter_vote_actions(self) -> AsyncIterator[dict]: ...
+
+    @abstractmethod
+    async def create_vote_action(self, vote_data: dict): ...
+
+    @abstractmethod
+    async def delete_vote_action(self, poll_id: str, vote_id): ...
+
+    # POLL TRENDING SCORES
+    @abstractmethod
+    async def get_trending_scores(self, limit: int) -> List[dict]: ...
+
+    @abstractmethod
+    async def add_trending_scores(self, entries: list): ...
+
+    @abstractmethod
+    async def delete_trending_scores_below(self, log_score: float): ...
+
+    # COUNTER RECONCILIATION
+    @abstractmethod
+    async def get_maintenance_state(self, job: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def save_maintenance_state(self, job: str, state: dict): ...
+
+    @abstractmethod
+    async def get_touched_poll_ids(
+        self, since: datetime, until: datetime
+    ) -> Set[str]: ...
+
+    @abstractmethod
+    async def get_poll_ids_page(self, after_id, limit: int) -> list: ...
+
+    # Counts only actions created before until
+    @abstractmethod
+    async def count_likes_by_poll(
+        self, poll_ids: list, until: datetime
+    ) -> Dict[str, int]: ...
+
+    @abstractmethod
+    async def count_votes_by_option(
+        self, poll_ids: list, until: datetime
+    ) -> Dict[str, int]: ...
+
+    # Only applied if the counter still holds expected and was not
+    # touched since until
+    @abstractmethod
+    async def set_poll_likes(
+        self, poll_id, expected: int, likes: int, until: datetime
+    ): ...
+
+    @abstractmethod
+    async def set_poll_option_votes(
+        self, poll_id: str, option_id, expected: int, votes: int, until: datetime
+    ): ...
+
+    # POLL CLOSING AND ARCHIVAL
+    @abstractmethod
+    async def close_poll(self, poll_id, closed_at: datetime): ...
+
+    @abstractmethod
+    async def get_polls_to_archive(
+        self, cutoff: datetime, limit: int
+    ) -> List[dict]: ...
+
+    @abstractmethod
+    async def claim_poll_archive(self, poll_id, until: datetime): ...
+
+    @abstractmethod
+    def iter_actions_for_poll(
+        self, poll_id: str, collection: str
+    ) -> AsyncIterator[dict]: ...
+
+    @abstractmethod
+    async def save_action_archive(self, poll_id: str, chunk: dict): ...
+
+    @abstractmethod
+    async def delete_actions_for_poll(self, poll_id: str) -> int: ...
+
+    @abstractmethod
+    async def set_poll_archive_state(self, poll_id, state: dict): ...
+
+    # IDEMPOTENCY KEYS
+    @abstractmethod
+    async def claim_idempotency_key(
+        self, key: str, expires_at: datetime
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def save_idempotent_response(
+        self, key: str, response: dict, expires_at: datetime
+    ): ...
+
+    @abstractmethod
+    async def release_idempotency_key(self, key: str): ...
@@ -0,0 +1,184 @@
+# utils/search.py
+import re
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import AsyncIterable, Dict, Iterable, List
+
+# Words are runs of letters/digits, matched case-insensitively
+_TOKEN_RE = re.compile(r"\w+")
+
+# A very short prefix ("a") can match a huge part of the vocabulary;
+# only this many vocabulary words are expanded for a single prefix
+MAX_PREFIX_EXPANSIONS = 256
+
+# A binary search probe costs about as much as scanning this many postings
+_PROBE_COST = 8
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def text_patterns(query: str) -> List[str]:
+    """
+    Regexes a poll text must all match (case-insensitively) to be a hit
+    for query: each token as a whole word, the last one as a word prefix.
+    Used to search the database while the index is not ready.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    *terms, prefix = tokens
+    patterns = [rf"\b{re.escape(term)}\b" for term in dict.fromkeys(terms)]
+    patterns.append(rf"\b{re.escape(prefix)}")
+    return patterns
+
+
+def _contains(postings: array, doc: int) -> bool:
+    """Binary search a sorted postings array."""
+    index = bisect_left(postings, doc)
+    return index < len(postings) and postings[index] == doc
+
+
+def _unique(docs: Iterable[int]):
+    """Drop consecutive duplicates from a sorted stream of doc numbers."""
+    last = None
+    for doc in docs:
+        if doc != last:
+            yield doc
+            last = doc
+
+
+class PollSearchIndex:
+    """
+    In-memory inverted index over poll text.
+
+    Every poll gets a sequential document number, and each token maps to a
+    compact array of the document numbers containing it. Numbers are only
+    ever handed out in increasing order, so the arrays stay sorted and can
+    be binary searched. The last query token is matched as a prefix against
+    a sorted vocabulary, so results show up while the user is still typing.
+    """
+
+    def __init__(self):
+        self.poll_ids: List[str] = []
+        self.doc_of: Dict[str, int] = {}
+        self.postings: Dict[str, array] = {}
+        self.vocabulary: List[str] = []
+        self.ready = False
+
+    def __len__(self):
+        return len(self.poll_ids)
+
+    def _add_document(self, poll_id: str, text: str, keep_sorted: bool):
+        if poll_id in self.doc_of:
+            return
+        doc = len(self.poll_ids)
+        self.poll_ids.append(poll_id)
+        self.doc_of[poll_id] = doc
+        for token in set(tokenize(text)):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = array("I")
+                if keep_sorted:
+                    insort(self.vocabulary, token)
+                else:
+                    self.vocabulary.append(token)
+            postings.append(doc)
+
+    def add(self, poll_id: str, text: str):
+        """Index a single new poll (e.g. right after it is created)."""
+        # While a bulk build is running the vocabulary is sorted at the end
+        self._add_document(poll_id, text, keep_sorted=self.ready)
+
+    def build_from(self, polls: Iterable[dict]):
+        """Index many polls at once; the vocabulary is sorted once at the end."""
+        for poll in polls:
+            self._add_document(str(poll["_id"]), poll["text"], keep_sorted=False)
+        self.vocabulary.sort()
+        self.ready = True
+
+    async def build(self, polls: AsyncIterable[dict]):
+        """Index every poll from a streaming cursor."""
+        count = 0
+        async for poll in polls:
+            self._add_document(str(poll["_id"]), poll["text"], keep_sorted=False)
+            count += 1
+        self.vocabulary.sort()
+        self.ready = True
+        print(f"🔎 Indexed {count} polls for search.")
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Vocabulary words starting with prefix (capped)."""
+        start = bisect_left(self.vocabulary, prefix)
+        words = []
+        for word in self.vocabulary[start : start + MAX_PREFIX_EXPANSIONS]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """
+        Return up to `limit` poll ids matching every query token, the last
+        one as a prefix. Most recently indexed polls come first.
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+        *terms, prefix = tokens
+
+        exact = []
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if postings is None:
+                return []
+            exact.append(postings)
+        expanded = [self.postings[word] for word in self._expand(prefix)]
+        if not expanded:
+            return []
+
+        # Drive the walk from the smallest stream (newest first) and probe
+        # the other streams with binary searches
+        exact.sort(key=len)
+        prefix_total = sum(len(p) for p in expanded)
+        if exact and len(exact[0]) <= prefix_total:
+            driver = exact[0]
+            required = exact[1:]
+            # Roughly how many candidates get probed before `limit` hits
+            expected_scan = min(len(driver), limit * len(self) / prefix_total)
+            probe_cost = expected_scan * len(expanded) * _PROBE_COST
+            if probe_cost > len(driver) + prefix_total:
+                # Many rare prefix words: one pass over their postings is
+                # cheaper than probing every one of them for every candidate
+                driver_docs = set(driver)
+                hits = set()
+                for postings in expanded:
+                    hits |= driver_docs.intersection(postings)
+                candidates = sorted(hits, reverse=True)
+                expanded = None
+            else:
+                candidates = reversed(driver)
+                # Probe the most common words first so any() stops early
+                expanded.sort(key=len, reverse=True)
+        else:
+            candidates = _unique(merge(*(reversed(p) for p in expanded), reverse=True))
+            required = exact
+            expanded = None
+
+        results = []
+        for doc in candidates:
+            if not all(_contains(p, doc) for p in required):
+                continue
+            if expanded is not None and not any(_contains(p, doc) for p in expanded):
+                continue
+            results.append(self.poll_ids[doc])
+            if len(results) >= limit:
+                break
+        return results
+
+
+# Create a single instance of the index
+search_index = PollSearchIndex()
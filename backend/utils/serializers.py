@@ -0,0 +1,105 @@
+# utils/serializers.py
+import json
+from functools import lru_cache
+from typing import Any, List
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from models.mongo_models import PollResponse, PollResultsResponse
+from settings import settings
+
+try:
+    # Optional, much faster JSON encoder
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _isoformat(value):
+    # Same format Pydantic uses for naive datetimes in JSON mode
+    return value.isoformat() if value is not None else None
+
+
+def option_to_json(option: dict) -> dict:
+    """PollOptionResponse-shaped, JSON-safe dict built from a BSON document."""
+    return {
+        "_id": str(option["_id"]),
+        "poll_id": option["poll_id"],
+        "text": option["text"],
+        "votes": option.get("votes", 0),
+        "created_at": _isoformat(option.get("created_at")),
+    }
+
+
+def poll_to_json(poll: dict) -> dict:
+    """PollResponse-shaped, JSON-safe dict built from a BSON document."""
+    return {
+        "_id": str(poll["_id"]),
+        "text": poll["text"],
+        "likes": poll.get("likes", 0),
+        "creator_id": poll["creator_id"],
+        "created_at": _isoformat(poll.get("created_at")),
+        "closes_at": _isoformat(poll.get("closes_at")),
+        "closed_at": _isoformat(poll.get("closed_at")),
+        "options": [option_to_json(option) for option in poll.get("options", ())],
+    }
+
+
+def dumps(data: Any) -> bytes:
+    """Encode JSON-safe data, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+@lru_cache(maxsize=None)
+def _adapter(annotation) -> TypeAdapter:
+    """Build each TypeAdapter (and its compiled serializer) only once."""
+    return TypeAdapter(annotation)
+
+
+def _validated_json(annotation, data) -> bytes:
+    adapter = _adapter(annotation)
+    return adapter.dump_json(adapter.validate_python(data), by_alias=True)
+
+
+def poll_response(poll: dict) -> Response:
+    """JSON response for a single poll document (with its options)."""
+    if settings.fast_responses:
+        content = dumps(poll_to_json(poll))
+    else:
+        content = _validated_json(PollResponse, poll)
+    return Response(content, media_type="application/json")
+
+
+def polls_response(polls: List[dict]) -> Response:
+    """JSON response for a list of poll documents."""
+    if settings.fast_responses:
+        content = dumps([poll_to_json(poll) for poll in polls])
+    else:
+        content = _validated_json(List[PollResponse], polls)
+    return Response(content, media_type="application/json")
+
+
+def poll_results_response(polls: List[dict]) -> Response:
+    """
+    Columnar JSON response with only the counts of several polls (each
+    {_id, likes, options: [{_id, votes}]}, or a full poll document).
+    """
+    data = {
+        "poll_ids": [str(poll["_id"]) for poll in polls],
+        "likes": [poll.get("likes", 0) for poll in polls],
+        "option_ids": [
+            [str(option["_id"]) for option in poll.get("options", ())] for poll in polls
+        ],
+        "votes": [
+            [option.get("votes", 0) for option in poll.get("options", ())]
+            for poll in polls
+        ],
+    }
+    if settings.fast_responses:
+        content = dumps(data)
+    else:
+        content = _validated_json(PollResultsResponse, data)
+    return Response(content, media_type="application/json")
@@ -0,0 +1,37 @@
+# utils/sharding.py
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Dict, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping & Veach): going from N to N + 1 buckets
+    moves only 1 / (N + 1) of the keys, all of them to the new bucket.
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & _MASK_64
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(poll_id, shard_count: int) -> int:
+    """Index of the shard that stores a poll (and its options and actions)."""
+    if shard_count == 1:
+        return 0
+    digest = blake2b(str(poll_id).encode(), digest_size=8).digest()
+    return _jump_hash(int.from_bytes(digest, "little"), shard_count)
+
+
+def group_by_shard(poll_ids: Iterable[T], shard_count: int) -> Dict[int, List[T]]:
+    """{shard index: the poll ids (str or ObjectId) stored on that shard}"""
+    groups = defaultdict(list)
+    for poll_id in poll_ids:
+        groups[shard_for(poll_id, shard_count)].append(poll_id)
+    return groups
@@ -0,0 +1,113 @@
+# utils/shutdown.py
+import asyncio
+import os
+import signal
+from time import monotonic
+from typing import Optional
+
+from settings import settings
+
+# How often the drain checks whether in-flight requests have finished
+_POLL_SECONDS = 0.05
+
+
+class GracefulDrain:
+    """
+    Drains a worker on SIGTERM before the server starts shutting down:
+
+    1. /ws stops accepting connections (see `draining`).
+    2. In-flight HTTP requests (counted by AdmissionMiddleware) get up to
+       half of DRAIN_TIMEOUT_SECONDS to finish, so their writes land and
+       their broadcasts still reach the open sockets.
+    3. Every socket is told to reconnect after a random delay within
+       DRAIN_RECONNECT_SPREAD_SECONDS, then closed.
+
+    Only then is the signal handed to the server's own handler (uvicorn's),
+    which stops listening and runs the lifespan shutdown; that uses
+    remaining() to bound the rest of the shutdown.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.in_flight = 0
+        self._deadline: Optional[float] = None
+        self._manager = None
+        self._task: Optional[asyncio.Task] = None
+
+    def install(self, manager):
+        """Chain the drain in front of the current SIGTERM handler."""
+        self._manager = manager
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            if self.draining:
+                # A second SIGTERM skips the rest of the drain
+                _pass_on(previous, signum, frame)
+                return
+            self.draining = True
+            loop.call_soon_threadsafe(self._start, previous, signum)
+
+        try:
+            signal.signal(signal.SIGTERM, on_sigterm)
+        except ValueError:
+            # Not the main thread: the server handles signals itself
+            print("⚠️ Not in the main thread; shutting down without a drain.")
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the drain deadline (None if not draining)."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - monotonic())
+
+    def _start(self, previous, signum: int):
+        self._task = asyncio.create_task(self._drain_then_pass_on(previous, signum))
+
+    async def _drain_then_pass_on(self, previous, signum: int):
+        try:
+            await self.drain()
+        except Exception as e:
+            print(f"❌ Drain failed: {e}")
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            _pass_on(previous, signum, None)
+
+    async def drain(self):
+        """Stop taking sockets, let requests finish, then move clients off."""
+        self.draining = True
+        self._deadline = monotonic() + settings.drain_timeout_seconds
+        sockets = len(self._manager.active_connections)
+        print(f"🚰 Draining: {self.in_flight} requests in flight, {sockets} sockets.")
+
+        # Leave half of the deadline for closing sockets and shutting down
+        requests_deadline = monotonic() + settings.drain_timeout_seconds / 2
+        while self.in_flight and monotonic() < requests_deadline:
+            await asyncio.sleep(_POLL_SECONDS)
+        if self.in_flight:
+            print(f"⚠️ {self.in_flight} requests still in flight after waiting.")
+
+        try:
+            await asyncio.wait_for(
+                self._manager.close_for_restart(
+                    settings.drain_reconnect_spread_seconds
+                ),
+                timeout=self.remaining(),
+            )
+        except asyncio.TimeoutError:
+            print("⚠️ Timed out closing sockets; the server closes the rest.")
+        print(
+            f"🚰 Drained in {settings.drain_timeout_seconds - self.remaining():.1f}s."
+        )
+
+
+def _pass_on(handler, signum: int, frame):
+    """Run a signal handler as returned by signal.getsignal()."""
+    if callable(handler):
+        handler(signum, frame)
+    elif handler == signal.SIG_DFL:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+# Shared drain state for the app
+shutdown_drain = GracefulDrain()
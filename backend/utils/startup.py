@@ -0,0 +1,117 @@
+# utils/startup.py
+import builtins
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Awaitable, List, Optional, Tuple
+
+from settings import settings
+
+# Imports nested deeper than this are folded into their parent in the report
+_REPORT_DEPTH = 2
+# Imports faster than this are left out of the report
+_REPORT_MIN_MS = 1.0
+
+
+class StartupProfile:
+    """
+    Times what a worker does before it serves its first request: every
+    module imported between start_import_timer() and stop_import_timer()
+    (cumulative, including what it imports in turn) and each lifespan
+    step. Enabled by STARTUP_PROFILE; report() prints nothing otherwise.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        # (depth, module, seconds) in import order; None until (unless) imported
+        self.imports: List[Optional[Tuple[int, str, float]]] = []
+        self.steps: List[Tuple[str, float]] = []
+        self._original_import = None
+        self._depth = 0
+        self._imports_started = 0.0
+        self._imports_seconds = 0.0
+        self._created = perf_counter()
+
+    def start_import_timer(self):
+        if not self.enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        self._imports_started = perf_counter()
+
+    def stop_import_timer(self):
+        if self._original_import is None:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+        self._imports_seconds = perf_counter() - self._imports_started
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            return self._original_import(name, globals, locals, fromlist, level)
+        if name not in sys.modules:
+            self._time_module(name)
+        if fromlist:
+            # "from package import module" loads the module without going
+            # through __import__, so time such submodules separately
+            package = sys.modules.get(name)
+            if hasattr(package, "__path__"):
+                for item in fromlist:
+                    submodule = f"{name}.{item}"
+                    if not hasattr(package, item) and submodule not in sys.modules:
+                        try:
+                            self._time_module(submodule)
+                        except ModuleNotFoundError:
+                            pass
+        return self._original_import(name, globals, locals, fromlist, level)
+
+    def _time_module(self, name: str):
+        index = len(self.imports)
+        self.imports.append(None)
+        depth = self._depth
+        self._depth += 1
+        started = perf_counter()
+        try:
+            self._original_import(name)
+            self.imports[index] = (depth, name, perf_counter() - started)
+        finally:
+            self._depth = depth
+
+    @contextmanager
+    def step(self, name: str):
+        """Time a block of startup code."""
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, perf_counter() - started))
+
+    async def timed(self, name: str, awaitable: Awaitable):
+        """Await a startup step, timing it."""
+        with self.step(name):
+            return await awaitable
+
+    def report(self):
+        """Print the import and step timings (when STARTUP_PROFILE is on)."""
+        if not self.enabled:
+            return
+        elapsed = perf_counter() - self._created
+        print(
+            f"⏱️ Startup profile: ready {elapsed * 1000:.1f} ms after main.py started"
+        )
+        print(f"  imports {self._imports_seconds * 1000:.1f} ms")
+        for entry in self.imports:
+            if entry is None:
+                continue
+            depth, name, seconds = entry
+            if depth < _REPORT_DEPTH and seconds * 1000 >= _REPORT_MIN_MS:
+                indent = "  " * (depth + 2)
+                print(f"{indent}{name:<{40 - len(indent)}}{seconds * 1000:10.1f} ms")
+        # Steps may overlap, so they are not summed
+        print("  steps")
+        for name, seconds in self.steps:
+            print(f"    {name:<36}{seconds * 1000:10.1f} ms")
+
+
+# Shared profile for the app's startup
+startup_profile = StartupProfile(settings.startup_profile)
@@ -0,0 +1,113 @@
+# utils/tracing.py
+import json
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import List, Optional
+
+from settings import settings
+
+
+class Span:
+    """A timed section of a request, with nested child spans."""
+
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def finish(self):
+        self.end = perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        end = perf_counter() if self.end is None else self.end
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: float) -> dict:
+        """Span tree as plain data, with start offsets relative to origin."""
+        data = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+# Innermost open span of the current request (None when not traced)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def should_sample() -> bool:
+    """Decide whether to trace a new request."""
+    return (
+        settings.trace_sample_rate > 0 and random.random() < settings.trace_sample_rate
+    )
+
+
+def start_trace(name: str):
+    """Open the root span of a request. Returns (root, token for end_trace)."""
+    root = Span(name)
+    return root, _current_span.set(root)
+
+
+def end_trace(root: Span, token):
+    root.finish()
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block as a child of the current span. Costs a single context
+    variable lookup when the request is not being traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield
+        return
+    child = Span(name)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def traced(func):
+    """Decorator: record every call of an async function as a span."""
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return await func(*args, **kwargs)
+        with span(func.__name__):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def log_slow_request(root: Span, method: str, route: str, path: str, status: int):
+    """Write the span tree of a slow request as one JSON line."""
+    print(
+        json.dumps(
+            {
+                "event": "slow_request",
+                "method": method,
+                "route": route,
+                "path": path,
+                "status": status,
+                "duration_ms": round(root.duration_ms, 3),
+                "trace": root.to_dict(root.start),
+            }
+        )
+    )
@@ -0,0 +1,42 @@
+# utils/users.py
+from typing import Optional
+
+from settings import settings
+from utils.cache import TTLCache
+from utils.database import get_user_by_email
+
+# Email -> user document. Shared, so never mutate one.
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+# Emails with no user
+_unknown_emails = TTLCache(
+    settings.user_cache_size, settings.user_negative_cache_ttl_seconds
+)
+
+
+def remember_user(user: dict):
+    """Cache a user document under its email."""
+    _unknown_emails.pop(user["email_id"])
+    user_cache.set(user["email_id"], user)
+
+
+async def get_cached_user_by_email(
+    email: str, negative: bool = False
+) -> Optional[dict]:
+    """
+    get_user_by_email, answered from memory when possible. With negative
+    (login only) unknown emails are remembered too: another worker may
+    register one meanwhile, which callers like /user/me must not miss.
+    """
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    if negative and email in _unknown_emails:
+        return None
+
+    user = await get_user_by_email(email)
+    if user is None:
+        if negative:
+            _unknown_emails.set(email, True)
+    else:
+        remember_user(user)
+    return user
@@ -70,14 +70,17 @@ export default function CreatePollPage() {
     }
 
     try {
-      // Create the Poll
+      // Create the Poll together with its options
       const pollRes = await fetch(`${API_URL}/polls/create`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token}`,
         },
-        body: JSON.stringify({ text: values.pollText }),
+        body: JSON.stringify({
+          text: values.pollText,
+          options: values.options.map((option) => ({ text: option.text })),
+        }),
       });
 
       const createdPoll: PollResponse = await pollRes.json();
@@ -86,27 +89,7 @@ export default function CreatePollPage() {
           (createdPoll as any).detail || "Failed to create poll."
         );
       }
-
-      // Add all options to the new poll
       const pollId = createdPoll._id;
-      const optionPromises = values.options.map((option) => {
-        return fetch(`${API_URL}/polls/${pollId}/options`, {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({ text: option.text }),
-        });
-      });
-
-      const optionResults = await Promise.all(optionPromises);
-
-      // Check if any option failed to be added
-      const failedOption = optionResults.find((res) => !res.ok);
-      if (failedOption) {
-        throw new Error("Poll created, but failed to add one or more options.");
-      }
 
       // Success, navigate to the new poll
       setIsLoading(false);
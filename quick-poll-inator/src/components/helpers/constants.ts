@@ -4,3 +4,6 @@ export const API_URL =
 
 export const WS_URL =
   process.env.NEXT_PUBLIC_WS_URL || "ws://127.0.0.1:8000/ws";
+
+// WebSocket subprotocol for broadcasts sent as zlib-compressed binary frames
+export const WS_DEFLATE_SUBPROTOCOL = "quickpoll.deflate";
@@ -40,5 +40,7 @@ export const pollFormSchema = z.object({
     })
   ).min(2, {
     message: "You must provide at least 2 options.",
+  }).max(50, {
+    message: "A poll can have at most 50 options.",
   }),
 });
@@ -9,7 +9,11 @@ import {
 } from "react";
 // Helpers
 import { PollResponse } from "@/components/helpers/types/Poll";
-import { API_URL, WS_URL } from "@/components/helpers/constants";
+import {
+  API_URL,
+  WS_URL,
+  WS_DEFLATE_SUBPROTOCOL,
+} from "@/components/helpers/constants";
 
 // Define the shape of our context
 interface PollsContextState {
@@ -21,6 +25,17 @@ interface PollsContextState {
 // Create the context
 const PollsContext = createContext<PollsContextState | undefined>(undefined);
 
+// Longest wait before reconnecting a dropped WebSocket
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+async function fetchPolls(): Promise<PollResponse[]> {
+  const res = await fetch(`${API_URL}/polls/`);
+  if (!res.ok) {
+    throw new Error("Failed to fetch polls");
+  }
+  return res.json();
+}
+
 // Define the props for our provider
 interface PollsProviderProps {
   children: ReactNode;
@@ -37,12 +52,7 @@ export function PollsProvider({ children }: PollsProviderProps) {
       setIsLoading(true);
       setError(null);
       try {
-        const res = await fetch(`${API_URL}/polls/`);
-        if (!res.ok) {
-          throw new Error("Failed to fetch polls");
-        }
-        const data: PollResponse[] = await res.json();
-        setPolls(data);
+        setPolls(await fetchPolls());
       } catch (err: any) {
         setError(err.message);
       } finally {
@@ -54,16 +64,28 @@ export function PollsProvider({ children }: PollsProviderProps) {
 
   // WebSocket connection and message handling
   useEffect(() => {
-    const ws = new WebSocket(WS_URL);
-
-    ws.onopen = () => {
-      console.log("WebSocket connected");
-    };
-
-    ws.onmessage = (event) => {
-      const message = JSON.parse(event.data);
+    // Ask for large broadcasts as compressed binary frames when the
+    // browser can decompress them
+    const canInflate = typeof DecompressionStream !== "undefined";
+    let ws: WebSocket;
+    let unmounted = false;
+    let connectedBefore = false;
+    let failedAttempts = 0;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    // Delay the server asked for before it closed the socket
+    let reconnectAfterMs: number | null = null;
+    // Decompression is async, so handle messages one after another
+    let pending = Promise.resolve();
+
+    const handleMessage = (raw: string) => {
+      const message = JSON.parse(raw);
       // console.log("WebSocket message:", JSON.stringify(message));
 
+      // The server is shutting down and spreads its clients' reconnects
+      if (message.type === "reconnect") {
+        reconnectAfterMs = message.data.after_ms;
+      }
+
       // A new poll was created
       if (message.type === "poll_created") {
         const newPoll = message.data as PollResponse;
@@ -79,16 +101,66 @@ export function PollsProvider({ children }: PollsProviderProps) {
       }
     };
 
-    ws.onclose = () => {
-      console.log("WebSocket disconnected");
+    const connect = () => {
+      ws = canInflate
+        ? new WebSocket(WS_URL, [WS_DEFLATE_SUBPROTOCOL])
+        : new WebSocket(WS_URL);
+      ws.binaryType = "blob";
+
+      ws.onopen = () => {
+        console.log("WebSocket connected");
+        failedAttempts = 0;
+        if (connectedBefore) {
+          // Catch up on the updates missed while disconnected
+          fetchPolls()
+            .then(setPolls)
+            .catch((err) => console.error("Failed to refresh polls:", err));
+        }
+        connectedBefore = true;
+      };
+
+      ws.onmessage = (event) => {
+        pending = pending
+          .then(async () => {
+            if (typeof event.data === "string") {
+              handleMessage(event.data);
+              return;
+            }
+            const inflated = (event.data as Blob)
+              .stream()
+              .pipeThrough(new DecompressionStream("deflate"));
+            handleMessage(await new Response(inflated).text());
+          })
+          .catch((err) => console.error("WebSocket message error:", err));
+      };
+
+      ws.onclose = () => {
+        console.log("WebSocket disconnected");
+        if (unmounted) {
+          return;
+        }
+        // Use the server's delay, else back off exponentially with full
+        // jitter so clients do not all reconnect at the same moment
+        const delay =
+          reconnectAfterMs ??
+          Math.random() *
+            Math.min(MAX_RECONNECT_DELAY_MS, 1000 * 2 ** failedAttempts);
+        reconnectAfterMs = null;
+        failedAttempts += 1;
+        reconnectTimer = setTimeout(connect, delay);
+      };
+
+      ws.onerror = (err) => {
+        console.error("WebSocket error:", err);
+      };
     };
 
-    ws.onerror = (err) => {
-      console.error("WebSocket error:", err);
-    };
+    connect();
 
     // Cleanup on component unmount
     return () => {
+      unmounted = true;
+      clearTimeout(reconnectTimer);
       ws.close();
     };
   }, []); // Empty dependency array ensures this runs once